@@ -0,0 +1,108 @@
+"""
+one animation for hundreds of transforms that run side by side, instead of one Transform each.
+
+the points of every source and target are aligned once and concatenated into one array, and every frame is a single
+numpy expression over all of them (one per distinct path_arc). the sources' points are views into that array, so
+nothing has to be copied back mobject by mobject.
+"""
+from typing import Iterable, List, Sequence, Tuple, Union
+
+import numpy as np
+from manim import OUT, Animation, VGroup, VMobject
+from manim.utils.family import extract_mobject_family_members
+from manim.utils.space_ops import rotation_matrix
+
+
+def _same_style(a: VMobject, b: VMobject) -> bool:
+    return (np.array_equal(a.get_fill_rgbas(), b.get_fill_rgbas())
+            and np.array_equal(a.get_stroke_rgbas(), b.get_stroke_rgbas())
+            and a.get_stroke_width() == b.get_stroke_width())
+
+
+class BatchTransform(Animation):
+    """
+    Transform(source, target, path_arc=arc) for every (source, target) pair, all at once.
+    like Transform, the sources end up looking like their targets and the targets themselves are never added to the
+    scene. sources that aren't in the scene yet are added one by one, the group wrapping them never stays in it.
+    only the styles of members whose style actually changes get interpolated.
+    """
+
+    def __init__(self, pairs: Iterable[Tuple[VMobject, VMobject]], path_arc: Union[float, Sequence[float]] = 0,
+                 **kwargs):
+        """
+        :param pairs: (source, target) pairs, sources shouldn't repeat
+        :param path_arc: the path_arc of every pair, or one for all of them
+        """
+        pairs = list(pairs)
+        self.sources = [source for source, _ in pairs]
+        self.targets = [target for _, target in pairs]
+        self.path_arcs = np.broadcast_to(np.asarray(path_arc, dtype=float), (len(pairs),))
+        super().__init__(VGroup(*self.sources), **kwargs)
+
+    @classmethod
+    def apply(cls, mobjects: Iterable[VMobject], method: str, *args, **kwargs) -> "BatchTransform":
+        """
+        the batched version of mobject.animate.method(*args) for every mobject
+        """
+        return cls((m, getattr(m.copy(), method)(*args)) for m in mobjects)
+
+    def clean_up_from_scene(self, scene):
+        super().clean_up_from_scene(scene)
+        # play() adds the wrapping group whenever it isn't in the scene (the camera only draws each family member
+        # once, so sources already on screen aren't doubled meanwhile). swap it for the sources that aren't in the
+        # scene some other way, or it keeps them around after they're removed
+        if self.mobject not in scene.mobjects:
+            return
+        i = scene.mobjects.index(self.mobject)
+        others = set(extract_mobject_family_members(scene.mobjects[:i] + scene.mobjects[i + 1:]))
+        scene.mobjects[i:i + 1] = [source for source in self.sources if source not in others]
+
+    def create_starting_mobject(self) -> VMobject:
+        # the start is kept as one point array instead of a copy of every source
+        return VMobject()
+
+    def begin(self):
+        members: List[Tuple[VMobject, VMobject, float]] = []
+        for source, target, arc in zip(self.sources, self.targets, self.path_arcs):
+            target = target.copy()
+            source.align_data(target)
+            members += [(s, t, arc) for s, t in zip(source.get_family(), target.get_family()) if len(s.points)]
+        sizes = np.array([len(s.points) for s, _, _ in members], dtype=int)
+        ends = np.cumsum(sizes)
+        self._spans = [(s, end - size, end) for (s, _, _), size, end in zip(members, sizes, ends)]
+        start = np.concatenate([s.points for s, _, _ in members]) if members else np.zeros((0, 3))
+        end = np.concatenate([t.points for _, t, _ in members]) if members else np.zeros((0, 3))
+        arcs = np.repeat([arc for _, _, arc in members], sizes)
+        # (arc, the points that take it, their start, where they rotate around / how far they move)
+        self._paths = []
+        unique_arcs = np.unique(arcs)
+        for arc in unique_arcs:
+            index = slice(None) if len(unique_arcs) == 1 else np.nonzero(arcs == arc)[0]
+            vects = end[index] - start[index]
+            if arc == 0:
+                self._paths.append((arc, index, start[index], vects))
+            else:
+                # same path as manim's path_along_arc
+                centers = start[index] + 0.5 * vects + np.cross(OUT, vects / 2.0) / np.tan(arc / 2)
+                self._paths.append((arc, index, start[index] - centers, centers))
+        self._points = start.copy()
+        for s, a, b in self._spans:
+            s.points = self._points[a:b]
+        self._restyle = [(s, s.copy(), t) for s, t, _ in members if not _same_style(s, t)]
+        super().begin()
+
+    def interpolate_mobject(self, alpha: float):
+        alpha = self.rate_func(alpha)
+        for arc, index, a, b in self._paths:
+            if arc == 0:
+                self._points[index] = a + alpha * b
+            else:
+                self._points[index] = b + a @ rotation_matrix(alpha * arc, OUT).T
+        for s, start, target in self._restyle:
+            s.interpolate_color(start, target, alpha)
+
+    def finish(self):
+        super().finish()
+        # let go of the shared array, so changing one source later doesn't touch the rest
+        for s, a, b in self._spans:
+            s.points = self._points[a:b].copy()
@@ -0,0 +1,207 @@
+"""
+benchmarks for the math helpers in pascalmath.py and scene.py, for importing them and for building the scenes
+themselves, so a slowdown shows up here instead of hours into a render.
+
+the scenes are run with manim's dry_run, which goes through construct() without rendering or encoding anything.
+results are written as json and compared against a stored baseline, anything slower than the baseline by more than
+the threshold is reported and makes the exit code 1.
+
+usage: python benchmark.py [-k FILTER] [--rows 10 20] [-o OUT] [--baseline FILE] [--save-baseline] [--threshold 1.25]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from manim import (PI, RIGHT, UP, Animation, AnimationGroup, MathTex, Square, Text, Transform, Triangle,
+                   tempconfig)
+
+import glyphs
+import pascalmath
+import scene
+from batchtransform import BatchTransform
+
+# a timed call is repeated until it takes at least this long, so fast functions still get a stable number
+MIN_TIME = 0.2
+
+
+class Benchmark:
+    def __init__(self, name: str, func: Callable[[Any], Any], setup: Optional[Callable[[], Any]] = None,
+                 repeat: int = 5):
+        """
+        :param func: the code to time, gets whatever setup returned
+        :param setup: builds a fresh input for every call of func, not timed. all of them are built before the timed
+            calls, so it can't reset state between them
+        :param repeat: how many measurements to take the best and mean of
+        """
+        self.name = name
+        self.func = func
+        self.setup = setup or (lambda: None)
+        self.repeat = repeat
+
+    def _time(self, number: int) -> float:
+        args = [self.setup() for _ in range(number)]
+        start = time.perf_counter()
+        for arg in args:
+            self.func(arg)
+        return time.perf_counter() - start
+
+    def run(self) -> Dict[str, float]:
+        number = 1
+        while (elapsed := self._time(number)) < MIN_TIME and number < 10 ** 6:
+            number *= 10
+        times = [elapsed / number] + [self._time(number) / number for _ in range(self.repeat - 1)]
+        return {"best": min(times), "mean": statistics.mean(times), "number": number}
+
+
+def tex_benchmarks() -> List[Benchmark]:
+    formula = r"(1+x)^{n} = 1 + n x + \frac{n(n-1)}{2!}x^2 + \frac{n(n-1)(n-2)}{3!}x^3 + \cdots"
+    return [
+        Benchmark("tex_format_num[int]", lambda _: [pascalmath.tex_format_num(i) for i in range(1000)]),
+        Benchmark("tex_format_num[float]", lambda _: [pascalmath.tex_format_num(i / 7) for i in range(1000)]),
+        Benchmark("tex_format_num[complex]",
+                  lambda _: [pascalmath.tex_format_num(complex(i / 7, 1 / 3)) for i in range(1000)]),
+        Benchmark("transform_tex_symbols", lambda mobj: scene.transform_tex_symbols(mobj, "n", "3"),
+                  setup=lambda: MathTex(formula)),
+        Benchmark("split_text_by_word", lambda text: scene.split_text_by_word(text),
+                  setup=lambda: Text("   ".join(str(j) for j in pascalmath.pascal_row(20)), font_size=16)),
+        Benchmark("number_row[20]", lambda _: glyphs.number_row(pascalmath.pascal_row(20), font_size=16)),
+        Benchmark("fit_mobject_within_another", lambda mobj: scene.fit_mobject_within_another(mobj, Square(), 0.5),
+                  setup=lambda: Text("12345", font_size=16)),
+    ]
+
+
+def math_benchmarks() -> List[Benchmark]:
+    benchmarks = []
+    for rows in (10, 100, 1000):
+        benchmarks += [
+            Benchmark(f"pascal_row[{rows}]", lambda _, rows=rows: pascalmath.pascal_row(rows)),
+            Benchmark(f"pascal_rows[0:{rows}]", lambda _, rows=rows: pascalmath.pascal_rows(0, rows)),
+            Benchmark(f"pascal_row[2.5, {rows} terms]", lambda _, rows=rows: pascalmath.pascal_row(2.5, rows)),
+            Benchmark(f"pascal_row[-3+2j, {rows} terms]", lambda _, rows=rows: pascalmath.pascal_row(-3 + 2j, rows)),
+        ]
+    benchmarks += [
+        # every setup() runs before the timed loop, so the cache is cleared in the timed call itself
+        Benchmark("hybrid[fractional]",
+                  lambda _: (pascalmath.hybrid.cache_clear(), [pascalmath.hybrid(2.5, k) for k in range(100)])),
+        Benchmark("hybrid[negative]",
+                  lambda _: (pascalmath.hybrid.cache_clear(), [pascalmath.hybrid(-2.5, k) for k in range(20)])),
+        Benchmark("hybrid[cached]", lambda _: [pascalmath.hybrid(2.5, k) for k in range(100)]),
+    ]
+    return benchmarks
+
+
+def split_to_depth(depth: int):
+    tris = [Triangle()]
+    for _ in range(depth):
+        tris = [t for tri in tris for t in scene.split_triangle(tri)[1]]
+    return tris
+
+
+def sierpinski_benchmarks() -> List[Benchmark]:
+    benchmarks = []
+    for depth in (2, 4, 6):
+        benchmarks.append(Benchmark(f"split_triangle[depth {depth}]", lambda _, d=depth: split_to_depth(d),
+                                    repeat=3))
+    for depth in (6, 9, 12):
+        benchmarks.append(Benchmark(f"sierpinski_holes[depth {depth}]",
+                                    lambda _, d=depth: scene.sierpinski_holes(Triangle().get_vertices(), d)))
+    benchmarks.append(Benchmark("binomial_residues[2000, p=3]", lambda _: pascalmath.binomial_residues(2000, 3)))
+    return benchmarks
+
+
+def play_frames(animation: Animation, frames: int = 30):
+    animation.begin()
+    for i in range(frames):
+        animation.interpolate(i / (frames - 1))
+    animation.finish()
+
+
+def animation_benchmarks() -> List[Benchmark]:
+    def squares():
+        return [Square().shift(RIGHT * (i % 30) + UP * (i // 30)) for i in range(600)]
+
+    return [
+        Benchmark("Transform x600[30 frames]",
+                  lambda ms: play_frames(AnimationGroup(*[Transform(m, m.copy().scale(0), path_arc=PI) for m in ms])),
+                  setup=squares, repeat=3),
+        Benchmark("BatchTransform x600[30 frames]",
+                  lambda ms: play_frames(BatchTransform(((m, m.copy().scale(0)) for m in ms), path_arc=PI)),
+                  setup=squares, repeat=3),
+    ]
+
+
+def import_benchmarks() -> List[Benchmark]:
+    # every import in a fresh interpreter, which is what each render worker pays before it does anything
+    def fresh_import(module: str) -> Benchmark:
+        return Benchmark(f"import[{module}]",
+                         lambda _: subprocess.run([sys.executable, "-c", f"import {module}"], check=True), repeat=3)
+
+    return [fresh_import(module) for module in ("pascalmath", "manim", "scene", "gmpy2", "scipy.special", "sympy")]
+
+
+def render_dry(scene_class: type):
+    with tempconfig({"dry_run": True, "disable_caching": True, "progress_bar": "none", "verbosity": "ERROR"}):
+        scene_class().render()
+
+
+def scene_benchmarks(row_counts: List[int]) -> List[Benchmark]:
+    benchmarks = []
+    for name in ("Serpinski", "Phi", "BuildTriangle", "Squares"):
+        for rows in row_counts:
+            scene_class = type(name, (getattr(scene, name),), {"num_of_rows": rows})
+            benchmarks.append(Benchmark(f"{name}.construct[{rows} rows]", lambda _, c=scene_class: render_dry(c),
+                                        repeat=1))
+    return benchmarks
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """
+    print every result next to its baseline
+    :return: names of the benchmarks that got slower than baseline * threshold
+    """
+    regressions = []
+    for name, result in results.items():
+        line = f"{name:<40} {result['best'] * 1000:>12.3f} ms"
+        if name in baseline:
+            ratio = result["best"] / baseline[name]["best"]
+            line += f"  {ratio:>6.2f}x baseline"
+            if ratio > threshold:
+                line += "  REGRESSION"
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="benchmark the scene.py helpers and scene construction")
+    parser.add_argument("-k", "--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 20], help="row counts to build the scenes with")
+    parser.add_argument("-o", "--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default="benchmark_baseline.json")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown factor counted as a regression")
+    args = parser.parse_args()
+
+    benchmarks = (import_benchmarks() + math_benchmarks() + tex_benchmarks() + sierpinski_benchmarks()
+                  + animation_benchmarks() + scene_benchmarks(args.rows))
+    results = {b.name: b.run() for b in benchmarks if args.filter in b.name}
+    with open(args.output, "w+") as f:
+        json.dump(results, f, indent=4)
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+    regressions = compare(results, baseline, args.threshold)
+    if args.save_baseline:
+        with open(args.baseline, "w+") as f:
+            json.dump(baseline | results, f, indent=4)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+fibonacci numbers for the Phi scene.
+
+fib() keeps the indexing scene.py always used, fib(0) = fib(1) = 1, everything else uses the standard F(0) = 0.
+"""
+import decimal
+from decimal import Decimal
+from fractions import Fraction
+from typing import Iterator, List, Optional, Tuple, Union
+
+# F(0), F(1), ... grown on demand. indices further than TABLE_STEP past its end use fast doubling instead
+TABLE_STEP = 1024
+_table: List[int] = [0, 1]
+
+
+def _fast_doubling(n: int) -> Tuple[int, int]:
+    """
+    (F(n), F(n + 1)) in O(log n) big int multiplications, using
+    F(2k) = F(k) * (2F(k + 1) - F(k)) and F(2k + 1) = F(k)^2 + F(k + 1)^2
+    """
+    a, b = 0, 1
+    for bit in bin(n)[2:]:
+        a, b = a * (2 * b - a), a * a + b * b
+        if bit == "1":
+            a, b = b, a + b
+    return a, b
+
+
+def fib_table(stop: int) -> List[int]:
+    """
+    make sure F(0)..F(stop - 1) are in the table, extending it from where it ends
+    :return: the table, don't modify it
+    """
+    a, b = _table[-2], _table[-1]
+    for _ in range(stop - len(_table)):
+        a, b = b, a + b
+        _table.append(b)
+    return _table
+
+
+def fibonacci(n: int) -> int:
+    """
+    F(n), from the table if it's there or close to its end, otherwise by fast doubling
+    """
+    if n < len(_table) + TABLE_STEP:
+        return fib_table(n + 1)[n]
+    return _fast_doubling(n)[0]
+
+
+def fib(n: int) -> int:
+    return fibonacci(n + 1)
+
+
+def fib_ratios(start: int, stop: int, digits: Optional[int] = None) -> Iterator[Union[Fraction, Decimal]]:
+    """
+    the ratios fib(n + 1) / fib(n) for n in start..stop-1, which converge on phi
+    :param digits: if supplied, yield decimals with this many significant digits instead of exact fractions
+    """
+    table = fib_table(stop + 2)
+    for n in range(start, stop):
+        numerator, denominator = table[n + 2], table[n + 1]
+        if digits:
+            with decimal.localcontext() as ctx:
+                ctx.prec = digits
+                ratio = Decimal(numerator) / Decimal(denominator)
+            yield ratio
+        else:
+            yield Fraction(numerator, denominator)
@@ -0,0 +1,73 @@
+"""
+numeric labels assembled from cached glyphs, so labeling a big triangle doesn't run the text shaper once per number.
+
+every character a number can be made of is shaped once per font and size, and a label is copies of those glyphs laid
+out with the advance widths measured from the same shaping.
+"""
+import functools
+from typing import Iterable, Union
+
+from manim import DEFAULT_FONT_SIZE, DOWN, LEFT, RIGHT, UP, Line, Text, VGroup
+
+# digits first, their spacing is measured from them
+CHARS = "0123456789-+.e/i"
+
+
+class DigitAtlas:
+    def __init__(self, font_size: float = DEFAULT_FONT_SIZE, font: str = ""):
+        self.font_size = font_size
+        self.font = font
+        shaped = Text(CHARS, font_size=font_size, font=font)
+        digits = shaped[:10]
+        # digits are tabular in practically every font, so their centers are evenly spaced
+        self.pitch = (digits[9].get_center()[0] - digits[0].get_center()[0]) / 9
+        gap = self.pitch - max(d.width for d in digits)
+        self.glyphs = {}
+        self.advances = {}
+        for char, glyph in zip(CHARS, shaped):
+            # left edge at x = 0, the height stays where the shaper put it so everything shares a baseline
+            self.glyphs[char] = glyph.copy().shift(LEFT * glyph.get_left()[0])
+            self.advances[char] = self.pitch if char.isdigit() else glyph.width + gap
+
+    def label(self, text: str) -> VGroup:
+        """
+        :param text: made of CHARS only, anything else falls back to a regular Text
+        :return: a VGroup with a glyph per character, like the words split_text_by_word returns
+        """
+        if not set(text) <= self.glyphs.keys():
+            return VGroup(*Text(text, font_size=self.font_size, font=self.font))
+        x = 0
+        glyphs = []
+        for char in text:
+            glyph = self.glyphs[char].copy()
+            # centered in its advance, so digits of different widths still line up like tabular figures
+            glyph.shift(RIGHT * (x + (self.advances[char] - glyph.width) / 2))
+            glyphs.append(glyph)
+            x += self.advances[char]
+        return VGroup(*glyphs)
+
+    def fraction(self, numerator: str, denominator: str) -> VGroup:
+        top = self.label(numerator)
+        bottom = self.label(denominator)
+        width = max(top.width, bottom.width)
+        bar = Line(LEFT * width / 2, RIGHT * width / 2, stroke_width=2 * self.font_size / DEFAULT_FONT_SIZE)
+        top.next_to(bar, UP, buff=self.pitch / 4)
+        bottom.next_to(bar, DOWN, buff=self.pitch / 4)
+        return VGroup(top, bar, bottom)
+
+
+@functools.cache
+def digit_atlas(font_size: float = DEFAULT_FONT_SIZE, font: str = "") -> DigitAtlas:
+    return DigitAtlas(font_size, font)
+
+
+def number_label(number: Union[int, str], font_size: float = DEFAULT_FONT_SIZE, font: str = "") -> VGroup:
+    return digit_atlas(font_size, font).label(str(number))
+
+
+def number_row(numbers: Iterable[Union[int, str]], font_size: float = DEFAULT_FONT_SIZE, font: str = "") -> VGroup:
+    """
+    a label per number, spaced out in a row like a row of the triangle written as Text
+    """
+    atlas = digit_atlas(font_size, font)
+    return VGroup(*[atlas.label(str(n)) for n in numbers]).arrange(RIGHT, buff=atlas.pitch * 3)
@@ -0,0 +1,262 @@
+"""
+per section timings of a render, written into the section index (Scene.json) next to what manim puts there, so they
+get carried through mergesections.py along with everything else.
+
+with PASCALMANIM_MEMORY=1 the memory use of every section is tracked too and written to <scene>.memory.json next to
+the movie.
+"""
+import contextlib
+import gc
+import json
+import os
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+from manim import Mobject, config, logger
+from manim.utils.family import extract_mobject_family_members
+
+import texcache
+
+
+class SectionStats:
+    def __init__(self, index: int, name: str):
+        self.index = index
+        self.name = name
+        self.started = time.perf_counter()
+        self.wall_seconds = 0.0
+        self.play_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.encode_seconds = 0.0
+        self.animations = 0
+        self.plays = 0
+        self.waits = 0
+        self.frames = 0
+        # frames encoded from one held frame, see stillframes.py, these are part of frames too
+        self.held_frames = 0
+        self._tex_start = dict(texcache.compile_stats)
+        self.tex_compiles = 0
+        self.tex_seconds = 0.0
+
+    def finish(self):
+        self.wall_seconds = time.perf_counter() - self.started
+        self.tex_compiles = texcache.compile_stats["compiles"] - self._tex_start["compiles"]
+        self.tex_seconds = texcache.compile_stats["seconds"] - self._tex_start["seconds"]
+
+    def as_dict(self) -> Dict[str, Any]:
+        animated = self.play_seconds + self.wait_seconds
+        return {
+            "index": self.index,
+            "wall_seconds": self.wall_seconds,
+            # everything outside of play() and wait(), building mobjects, TeX and so on
+            "construct_seconds": self.wall_seconds - animated,
+            "play_seconds": self.play_seconds,
+            "wait_seconds": self.wait_seconds,
+            # the part of play() and wait() spent handing frames to ffmpeg, the rest is mostly rasterizing
+            "encode_seconds": self.encode_seconds,
+            "tex_seconds": self.tex_seconds,
+            "tex_compiles": self.tex_compiles,
+            "animations": self.animations,
+            "plays": self.plays,
+            "waits": self.waits,
+            "frames": self.frames,
+            "held_frames": self.held_frames,
+            "frames_per_second": self.frames / animated if animated else 0.0,
+        }
+
+
+class SectionTimer:
+    """
+    collects a SectionStats for every section of a scene, PascalScene feeds it
+    """
+
+    def __init__(self, file_writer):
+        self.file_writer = file_writer
+        # the manim Section each stats belongs to, to find it in the index afterwards
+        self.sections: List[Tuple[Any, SectionStats]] = []
+        self._timing = False
+        write_frame = file_writer.write_frame
+
+        def timed_write_frame(frame):
+            start = time.perf_counter()
+            write_frame(frame)
+            self.current.encode_seconds += time.perf_counter() - start
+            self.current.frames += 1
+
+        file_writer.write_frame = timed_write_frame
+
+    @property
+    def current(self) -> SectionStats:
+        return self.sections[-1][1]
+
+    def start_section(self, index: int):
+        """
+        start timing the section the file writer just started
+        """
+        if self.sections:
+            self.current.finish()
+        section = self.file_writer.sections[-1]
+        self.sections.append((section, SectionStats(index, section.name)))
+
+    def finish(self):
+        if self.sections:
+            self.current.finish()
+
+    def hold(self, frames: int):
+        """
+        count frames that were encoded without going through write_frame
+        """
+        self.current.frames += frames
+        self.current.held_frames += frames
+
+    @contextlib.contextmanager
+    def timing(self, kind: str, animations: int = 0):
+        """
+        time a play() or wait() of the current section, nested calls (wait() calls play()) are only counted once
+        """
+        if self._timing:
+            yield
+            return
+        self._timing = True
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._timing = False
+            stats = self.current
+            if kind == "wait":
+                stats.waits += 1
+                stats.wait_seconds += time.perf_counter() - start
+            else:
+                stats.plays += 1
+                stats.animations += animations
+                stats.play_seconds += time.perf_counter() - start
+
+    def write(self):
+        """
+        add the stats of every section to the section index manim wrote, if sections were saved
+        """
+        for _, stats in self.sections:
+            d = stats.as_dict()
+            logger.debug(f"section {stats.index} '{stats.name}': {d['wall_seconds']:.2f}s, {d['frames']} frames, "
+                         f"{d['frames_per_second']:.1f} fps, {d['tex_seconds']:.2f}s TeX, "
+                         f"{d['encode_seconds']:.2f}s encoding")
+        if not config.save_sections:
+            return
+        index_path = os.path.join(self.file_writer.sections_output_dir, f"{self.file_writer.output_name}.json")
+        if not os.path.exists(index_path):
+            return
+        by_video = {section.video: stats for section, stats in self.sections if section.video}
+        with open(index_path) as f:
+            index = json.load(f)
+        partial_movies = {section.video: [os.path.abspath(f) for f in section.partial_movie_files if f]
+                          for section, _ in self.sections if section.video}
+        for entry in index:
+            if entry["video"] in by_video:
+                entry["stats"] = by_video[entry["video"]].as_dict()
+                # so moviecache.py knows which partial movies the latest render still needs
+                entry["partial_movies"] = partial_movies[entry["video"]]
+        with open(index_path, "w") as f:
+            json.dump(index, f, indent=4)
+
+
+def rss_bytes() -> Optional[int]:
+    """
+    resident set size of this process right now, None where /proc isn't there to ask
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """
+    the most this process has ever had resident
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+class MemoryTracker:
+    """
+    memory use of every section of a scene: rss, the peak of python allocations (tracemalloc), how many mobjects are
+    in the scene, and how many are alive but not in the scene.
+    a section is flagged as leaking if the mobjects that are alive but not in the scene grew during it and never went
+    back down in any of the (at least one) later sections, i.e. something kept references to them (like a copy() that
+    was transformed and never removed).
+    tracemalloc and counting every live object slow a render down noticeably, so this is opt in.
+    """
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.sections: List[Dict[str, Any]] = []
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _counts(self) -> Tuple[int, int]:
+        """
+        :return: (mobjects in the scene with their submobjects, mobjects alive anywhere)
+        """
+        in_scene = len(extract_mobject_family_members(self.scene.mobjects))
+        alive = sum(1 for o in gc.get_objects() if isinstance(o, Mobject))
+        return in_scene, alive
+
+    def start_section(self, index: int, name: str):
+        self.finish()
+        tracemalloc.reset_peak()
+        in_scene, alive = self._counts()
+        self.sections.append({"index": index, "name": name, "start_scene_mobjects": in_scene,
+                              "start_detached_mobjects": alive - in_scene, "done": False})
+
+    def finish(self):
+        """
+        record the end of the current section
+        """
+        if not self.sections or self.sections[-1]["done"]:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        in_scene, alive = self._counts()
+        self.sections[-1].update(done=True, rss_bytes=rss_bytes(), peak_rss_bytes=peak_rss_bytes(),
+                                 python_bytes=current, python_peak_bytes=peak, scene_mobjects=in_scene,
+                                 live_mobjects=alive, detached_mobjects=alive - in_scene)
+
+    def report(self) -> List[Dict[str, Any]]:
+        self.finish()
+        report = []
+        for i, section in enumerate(self.sections):
+            section = {k: v for k, v in section.items() if k != "done"}
+            later = [s["detached_mobjects"] for s in self.sections[i + 1:]]
+            grew = section["detached_mobjects"] > section["start_detached_mobjects"]
+            # the last section has nothing after it to show the growth stuck around
+            section["leak_suspect"] = grew and bool(later) and all(d >= section["detached_mobjects"] for d in later)
+            report.append(section)
+        return report
+
+    def write(self, file_writer) -> str:
+        """
+        write the report next to the movie. not into the sections dir, everything there is a section index to
+        mergesections.py
+        :return: where it was written
+        """
+        if getattr(file_writer, "movie_file_path", None):
+            directory = os.path.dirname(file_writer.movie_file_path)
+        else:
+            directory = config.media_dir
+        path = os.path.join(directory, f"{file_writer.output_name}.memory.json")
+        report = self.report()
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=4)
+        for section in report:
+            if section["leak_suspect"]:
+                logger.warning(f"section {section['index']} '{section['name']}' left "
+                               f"{section['detached_mobjects'] - section['start_detached_mobjects']} more mobjects "
+                               f"alive outside the scene, and they never got freed")
+        return path
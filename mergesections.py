@@ -1,23 +1,347 @@
+"""
+merge the section videos in allsections/<group>/ into outsections/ with one Scene.json, and optionally also into a
+single video.
+
+every group can hold any subset of the sections, e.g. one group per render node or per parallelrender.py run, with
+the section indexes (*.json) that came with them. sections are put in the order of the scene they came from, by the
+number manim gave their video (its position in the whole scene, skipped sections included, see parallelrender.py),
+not by the order the groups are listed in. missing sections are reported, a section found in more than one group is
+merged once, and a section whose copies differ (another render, another name) is an error unless --newest says to
+take the most recently written copy.
+
+the single video is the sections concatenated with ffmpeg's concat demuxer and -c copy, so nothing gets re-encoded,
+except sections whose codec parameters don't match the rest, which can't be stream copied into the same file. those
+are re-encoded to match once and kept in outsections/.reencoded. chapters.json and the chapters of the video come
+from the section names and durations.
+
+usage: python mergesections.py [--concat OUTPUT.mp4] [--newest] [--strict] [-j JOBS]
+"""
+import argparse
+import collections
+import hashlib
 import json
 import os
+import re
 import shutil
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from fractions import Fraction
+from typing import Dict, List, Tuple
+
+OUTDIR = "outsections"
+# hashes of the inputs (by path, size and mtime) and of what's already in OUTDIR, so reruns only touch what changed
+STATE_FILE = os.path.join(OUTDIR, ".mergestate.json")
+# linux ioctl for a copy-on-write clone, works on btrfs/xfs and fails harmlessly everywhere else
+FICLONE = 0x40049409
+REENCODED_DIR = os.path.join(OUTDIR, ".reencoded")
+FFMPEG = "ffmpeg"
+FFPROBE = "ffprobe"
+# the video stream parameters that have to be the same for sections to be stream copied into one file
+CONCAT_PARAMS = ("codec_name", "profile", "width", "height", "pix_fmt", "r_frame_rate", "time_base")
+ENCODERS = {"h264": "libx264", "hevc": "libx265", "vp9": "libvpx-vp9", "av1": "libaom-av1", "prores": "prores_ks"}
+# how manim names section videos, <scene>_<position in the scene>.mp4
+SECTION_VIDEO = re.compile(r"^(?P<scene>.+)_(?P<number>\d+)\.\w+$")
+H264_PROFILES = {"Constrained Baseline": "baseline", "Baseline": "baseline", "Main": "main", "High": "high",
+                 "High 10": "high10", "High 4:2:2": "high422", "High 4:4:4 Predictive": "high444"}
+
+
+def file_hash(path: str, known: Dict[str, dict]) -> str:
+    """
+    sha256 of a file, only actually read if its size or mtime changed since it was hashed into known
+    """
+    st = os.stat(path)
+    entry = known.get(path)
+    if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+        return entry["sha256"]
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(chunk)
+    known[path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": hasher.hexdigest()}
+    return known[path]["sha256"]
+
+
+def reflink(src: str, dst: str) -> bool:
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            return True
+        except OSError:
+            pass
+    os.remove(dst)
+    return False
+
+
+def link_or_copy(src: str, dst: str) -> str:
+    """
+    put src at dst without copying any bytes where the filesystem allows it
+    :return: how it was done, "reflink", "hardlink" or "copy"
+    """
+    if reflink(src, dst):
+        return "reflink"
+    try:
+        os.link(src, dst)
+        return "hardlink"
+    except OSError:
+        shutil.copyfile(src, dst)
+        return "copy"
+
+
+def load_state() -> dict:
+    try:
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def probe(path: str) -> Tuple[Tuple, float]:
+    """
+    :return: (the CONCAT_PARAMS of the first video stream, duration in seconds)
+    """
+    out = subprocess.run([FFPROBE, "-v", "error", "-select_streams", "v:0", "-show_entries",
+                          f"stream={','.join(CONCAT_PARAMS)}:format=duration", "-of", "json", path],
+                         check=True, capture_output=True, text=True).stdout
+    info = json.loads(out)
+    stream = info["streams"][0]
+    return tuple(stream.get(p) for p in CONCAT_PARAMS), float(info["format"]["duration"])
+
+
+def reencode(src: str, dst: str, params: Tuple):
+    """
+    re-encode src into dst with the given CONCAT_PARAMS, audio is copied as is
+    """
+    p = dict(zip(CONCAT_PARAMS, params))
+    cmd = [FFMPEG, "-y", "-v", "error", "-i", src, "-c:v", ENCODERS.get(p["codec_name"], p["codec_name"]),
+           "-pix_fmt", p["pix_fmt"], "-vf", f"scale={p['width']}:{p['height']}", "-r", p["r_frame_rate"],
+           "-video_track_timescale", str(Fraction(p["time_base"]).denominator)]
+    if p["codec_name"] == "h264" and p["profile"] in H264_PROFILES:
+        cmd += ["-profile:v", H264_PROFILES[p["profile"]]]
+    tmp = dst + ".tmp.mp4"
+    subprocess.run(cmd + ["-c:a", "copy", tmp], check=True)
+    os.replace(tmp, dst)
+
+
+def chapter_index(entries: List[dict], durations: List[float]) -> List[dict]:
+    """
+    a chapter per section, consecutive sections with the same name are merged into one
+    """
+    chapters = []
+    start = 0.0
+    for entry, duration in zip(entries, durations):
+        if chapters and chapters[-1]["name"] == entry["name"]:
+            chapters[-1]["end"] += duration
+        else:
+            chapters.append({"name": entry["name"], "start": start, "end": start + duration})
+        start += duration
+    return chapters
+
+
+def write_ffmetadata(chapters: List[dict], path: str):
+    def escape(s: str) -> str:
+        for c in "\\=;#\n":
+            s = s.replace(c, "\\" + c)
+        return s
 
-if os.path.isdir("outsections"):
-    shutil.rmtree("outsections")
-os.mkdir("outsections")
-videos = {}
-for secgroup in os.listdir("allsections"):
+    with open(path, "w+") as f:
+        f.write(";FFMETADATA1\n")
+        for chapter in chapters:
+            f.write(f"[CHAPTER]\nTIMEBASE=1/1000\nSTART={round(chapter['start'] * 1000)}\n"
+                    f"END={round(chapter['end'] * 1000)}\ntitle={escape(chapter['name'])}\n")
+
+
+def concat_sections(scenejson: List[dict], digests: Dict[str, str], output: str) -> collections.Counter:
+    """
+    concatenate the merged sections, in Scene.json order, into output without re-encoding them
+    :param digests: hash of every video in OUTDIR, by name
+    :return: how many sections were stream copied and how many re-encoded
+    """
+    actions = collections.Counter()
+    if not scenejson:
+        return actions
+    probes = {name: probe(os.path.join(OUTDIR, name)) for name in {v["video"] for v in scenejson}}
+    # whatever most of the sections are encoded as is what the odd ones get re-encoded to
+    reference = collections.Counter(probes[v["video"]][0] for v in scenejson).most_common(1)[0][0]
+    reference_hash = hashlib.sha256(repr(reference).encode()).hexdigest()[:16]
+    os.makedirs(REENCODED_DIR, exist_ok=True)
+    paths = []
+    durations = []
+    reencoded = set()
+    for v in scenejson:
+        params, duration = probes[v["video"]]
+        path = os.path.abspath(os.path.join(OUTDIR, v["video"]))
+        if params != reference:
+            name = f"{digests[v['video']]}-{reference_hash}.mp4"
+            dest = os.path.join(REENCODED_DIR, name)
+            if not os.path.exists(dest):
+                reencode(path, dest, reference)
+            reencoded.add(name)
+            path = os.path.abspath(dest)
+            duration = probe(dest)[1]
+            actions["reencoded"] += 1
+        else:
+            # manim writes the duration of every section into its index, ffprobe's is only needed if it didn't
+            duration = float(v.get("duration", duration))
+            actions["stream copied"] += 1
+        paths.append(path)
+        durations.append(duration)
+    for name in os.listdir(REENCODED_DIR):
+        if name not in reencoded:
+            os.remove(os.path.join(REENCODED_DIR, name))
+
+    chapters = chapter_index(scenejson, durations)
+    with open(os.path.join(OUTDIR, "chapters.json"), "w+") as f:
+        json.dump(chapters, f, indent=4)
+    list_path = os.path.join(OUTDIR, "concat.txt")
+    with open(list_path, "w+") as f:
+        for path in paths:
+            f.write("file '" + path.replace("'", "'\\''") + "'\n")
+    metadata_path = os.path.join(OUTDIR, "chapters.ffmeta")
+    write_ffmetadata(chapters, metadata_path)
+    subprocess.run([FFMPEG, "-y", "-v", "error", "-f", "concat", "-safe", "0", "-i", list_path, "-i", metadata_path,
+                    "-map", "0", "-map_metadata", "1", "-map_chapters", "1", "-c", "copy", "-movflags", "+faststart",
+                    output], check=True)
+    return actions
+
+
+def section_key(entry: dict) -> Tuple[str, int]:
+    """
+    :return: (scene, position in the scene) of a section index entry
+    """
+    match = SECTION_VIDEO.match(entry["video"])
+    if match:
+        return match["scene"], int(match["number"])
+    # not named by manim, the index instrumentation.py writes is the next best thing
+    return entry["video"], entry.get("stats", {}).get("index", 0)
+
+
+def read_group(secgroup: str, known: Dict[str, dict]) -> List[dict]:
+    """
+    every section of one group, with its file hashed
+    """
     secdir = os.path.join("allsections", secgroup)
-    with open(os.path.join(secdir, "Scene.json")) as f:
-        data = json.load(f)
-    for video in data:
-        videos[os.path.abspath(os.path.join(secdir, video["video"]))] = video
-
-scenejson = []
-for i, (k, v) in enumerate(videos.items()):
-    v["video"] = f"section{i}.mp4"
-    scenejson.append(v)
-    shutil.copy(k, os.path.join("outsections", f"section{i}.mp4"))
-
-with open("outsections/Scene.json", "w+") as f:
-    json.dump(scenejson, f, indent=4)
+    sections = []
+    for index_name in sorted(n for n in os.listdir(secdir) if n.endswith(".json")):
+        with open(os.path.join(secdir, index_name)) as f:
+            data = json.load(f)
+        # only manim's section indexes, a list of sections that each have a video
+        if not isinstance(data, list):
+            continue
+        for entry in data:
+            if not isinstance(entry, dict) or "video" not in entry:
+                continue
+            path = os.path.abspath(os.path.join(secdir, entry["video"]))
+            sections.append({"group": secgroup, "path": path, "entry": entry, "key": section_key(entry),
+                             "digest": file_hash(path, known), "mtime_ns": os.stat(path).st_mtime_ns})
+    return sections
+
+
+def resolve(sections: List[dict], newest: bool = False) -> Tuple[List[dict], dict]:
+    """
+    one copy of every section, in scene order
+    :param sections: every section of every group, scenes are ordered by where they first appear in here
+    :param newest: take the most recently written copy of conflicting sections instead of leaving them out
+    :return: (the sections to merge, {"gaps": ..., "overlaps": ..., "conflicts": ...})
+    """
+    by_key = collections.defaultdict(list)
+    for section in sections:
+        by_key[section["key"]].append(section)
+    scene_order = {scene: i for i, scene in enumerate(dict.fromkeys(s["key"][0] for s in sections))}
+    chosen = []
+    report = {"gaps": [], "overlaps": [], "conflicts": []}
+    for key in sorted(by_key, key=lambda k: (scene_order[k[0]], k[1])):
+        copies = by_key[key]
+        versions = {(c["digest"], c["entry"]["name"], c["entry"].get("stats", {}).get("index")) for c in copies}
+        if len(copies) > 1:
+            report["overlaps"].append((key, [c["group"] for c in copies]))
+        if len(versions) > 1:
+            report["conflicts"].append((key, [c["group"] for c in copies]))
+            if not newest:
+                continue
+        chosen.append(max(copies, key=lambda c: c["mtime_ns"]))
+    numbers = collections.defaultdict(set)
+    for scene, number in by_key:
+        numbers[scene].add(number)
+    for scene, found in numbers.items():
+        report["gaps"] += [(scene, number) for number in range(max(found) + 1) if number not in found]
+    return chosen, report
+
+
+def print_report(report: dict):
+    for scene, number in report["gaps"]:
+        print(f"missing: section {number} of {scene}", file=sys.stderr)
+    for (scene, number), groups in report["overlaps"]:
+        print(f"overlap: section {number} of {scene} is in {', '.join(groups)}", file=sys.stderr)
+    for (scene, number), groups in report["conflicts"]:
+        print(f"conflict: the copies of section {number} of {scene} in {', '.join(groups)} differ", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="merge the section videos in allsections/ into outsections/")
+    parser.add_argument("--concat", metavar="OUTPUT", help="also stream copy every section into this one video")
+    parser.add_argument("--newest", action="store_true",
+                        help="merge the most recently written copy of conflicting sections instead of failing")
+    parser.add_argument("--strict", action="store_true", help="fail if any section is missing")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="groups read and hashed in parallel")
+    args = parser.parse_args()
+    os.makedirs(OUTDIR, exist_ok=True)
+    state = load_state()
+    input_hashes = state.get("inputs", {})
+    outputs = state.get("outputs", {})
+
+    # sorted so the order scenes are first seen in doesn't depend on the filesystem
+    groups = sorted(os.listdir("allsections"))
+    with ThreadPoolExecutor(args.jobs) as pool:
+        sections = [s for group in pool.map(lambda g: read_group(g, input_hashes), groups) for s in group]
+    chosen, report = resolve(sections, args.newest)
+    print_report(report)
+    if report["conflicts"] and not args.newest:
+        sys.exit("conflicting sections, rerun with --newest to merge the most recent copies")
+    if report["gaps"] and args.strict:
+        sys.exit("missing sections")
+
+    scenejson = []
+    # identical videos all point to the file of the first one
+    names_by_hash = {}
+    new_outputs = {}
+    actions = collections.Counter()
+    for i, section in enumerate(chosen):
+        digest = section["digest"]
+        if digest not in names_by_hash:
+            name = f"section{i}.mp4"
+            names_by_hash[digest] = name
+            new_outputs[name] = digest
+            dest = os.path.join(OUTDIR, name)
+            if outputs.get(name) == digest and os.path.exists(dest):
+                actions["unchanged"] += 1
+            else:
+                # never write through an old hardlink, that would change the input it points to
+                if os.path.lexists(dest):
+                    os.remove(dest)
+                actions[link_or_copy(section["path"], dest)] += 1
+        else:
+            actions["deduplicated"] += 1
+        entry = dict(section["entry"], video=names_by_hash[digest])
+        scenejson.append(entry)
+
+    for name in os.listdir(OUTDIR):
+        if name.startswith("section") and name.endswith(".mp4") and name not in new_outputs:
+            os.remove(os.path.join(OUTDIR, name))
+
+    with open(os.path.join(OUTDIR, "Scene.json"), "w+") as f:
+        json.dump(scenejson, f, indent=4)
+    with open(STATE_FILE, "w+") as f:
+        json.dump({"inputs": {s["path"]: input_hashes[s["path"]] for s in sections}, "outputs": new_outputs}, f,
+                  indent=4)
+    if args.concat:
+        actions += concat_sections(scenejson, new_outputs, args.concat)
+    print(", ".join(f"{count} {action}" for action, count in actions.items()))
+
+
+if __name__ == "__main__":
+    main()
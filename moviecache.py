@@ -0,0 +1,224 @@
+"""
+one byte budget for the partial movie files of every scene, instead of manim's per scene file count.
+
+manim's max_files_cached only counts files, per scene, and throws out the oldest ones, so a scene with lots of short
+animations pushes out the long expensive ones of the same scene while another scene's cache grows without bound.
+here every partial movie under media/videos/*/*/partial_movie_files/, and under parallelrender.py's
+media/shards/*/videos/ too, counts against one budget in bytes, and the least recently used ones go first, by when a
+render last used them (kept in media/.moviecache.json, filesystems don't reliably update access times), or by age.
+anything the latest render of a scene used is never evicted, that is what's listed in its
+partial_movie_file_list.txt and in the "partial_movies" of its section index.
+
+PascalScene counts the cache hits of every render, records what it used and evicts afterwards if
+PASCALMANIM_CACHE_BYTES (e.g. "20G") is set, PASCALMANIM_CACHE_MAX_AGE_DAYS also evicts anything unused for longer.
+without them nothing is deleted, the hit rate still gets logged.
+
+usage: python moviecache.py [--budget 20G] [--max-age-days DAYS] [--dry-run]
+"""
+import argparse
+import glob
+import json
+import os
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from manim import logger
+
+from sharedfiles import atomic_write, file_lock, media_root
+
+# how many renders to keep the hit rate of
+HISTORY = 100
+SIZE_UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_size(size: str) -> int:
+    """
+    "20G" -> bytes, plain numbers are bytes
+    """
+    size = size.strip().upper().rstrip("B")
+    if size and size[-1] in SIZE_UNITS:
+        return int(float(size[:-1]) * SIZE_UNITS[size[-1]])
+    return int(size)
+
+
+def _env_budget() -> Optional[int]:
+    budget = os.environ.get("PASCALMANIM_CACHE_BYTES")
+    return parse_size(budget) if budget else None
+
+
+def _env_max_age() -> Optional[float]:
+    days = os.environ.get("PASCALMANIM_CACHE_MAX_AGE_DAYS")
+    return float(days) if days else None
+
+
+def partial_movies_of(file_writer) -> List[str]:
+    """
+    every partial movie a render used, cached or not
+    """
+    return [os.path.abspath(f) for section in file_writer.sections for f in section.partial_movie_files if f]
+
+
+class MovieCache:
+    def __init__(self, media_dir: Optional[str] = None, budget: Optional[int] = None,
+                 max_age_days: Optional[float] = None):
+        """
+        :param budget: bytes all the partial movies together may take, None for no limit
+        :param max_age_days: partial movies unused for longer than this are evicted, None for no limit
+        """
+        # the project's media dir, not a parallelrender shard's own
+        self.media_dir = os.path.abspath(media_dir or media_root())
+        self.budget = budget
+        self.max_age_days = max_age_days
+        self.log_path = os.path.join(self.media_dir, ".moviecache.json")
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "MovieCache":
+        return cls(budget=_env_budget(), max_age_days=_env_max_age())
+
+    def watch(self, file_writer):
+        """
+        count the cache lookups of a render
+        """
+        is_already_cached = file_writer.is_already_cached
+
+        def counted_is_already_cached(hash_invocation: str) -> bool:
+            cached = is_already_cached(hash_invocation)
+            if cached:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return cached
+
+        file_writer.is_already_cached = counted_is_already_cached
+
+    def _video_dirs(self) -> List[str]:
+        shards = glob.glob(os.path.join(self.media_dir, "shards", "*", "videos"))
+        return [os.path.join(self.media_dir, "videos")] + shards
+
+    def _partial_movie_dirs(self) -> List[str]:
+        return [d for videos in self._video_dirs()
+                for d in glob.glob(os.path.join(videos, "*", "*", "partial_movie_files", "*"))]
+
+    def entries(self) -> List[Tuple[str, int, float]]:
+        """
+        :return: (path, size, mtime) of every partial movie of every scene
+        """
+        entries = []
+        for directory in self._partial_movie_dirs():
+            for entry in os.scandir(directory):
+                if entry.is_file() and not entry.name.endswith(".txt"):
+                    st = entry.stat()
+                    entries.append((os.path.abspath(entry.path), st.st_size, st.st_mtime))
+        return entries
+
+    def protected(self) -> Set[str]:
+        """
+        the partial movies the latest render of any scene used
+        """
+        paths = set()
+        for directory in self._partial_movie_dirs():
+            try:
+                with open(os.path.join(directory, "partial_movie_file_list.txt")) as f:
+                    for line in f:
+                        # file 'file:/path/to/hash.mp4'
+                        if line.startswith("file "):
+                            path = line.strip()[6:-1]
+                            paths.add(os.path.abspath(path[5:] if path.startswith("file:") else path))
+            except OSError:
+                pass
+        index_paths = [path for videos in self._video_dirs()
+                       for path in glob.glob(os.path.join(videos, "*", "*", "sections", "*.json"))]
+        for index_path in index_paths:
+            try:
+                with open(index_path) as f:
+                    index = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for entry in index:
+                paths.update(os.path.abspath(p) for p in entry.get("partial_movies", []))
+        return paths
+
+    def _load_log(self) -> Dict:
+        try:
+            with open(self.log_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def record(self, file_writer, scene_name: str) -> Dict:
+        """
+        mark everything the render used as just used, evict what's over budget, and log the hit rate
+        :return: this render's hits, misses, hit_rate, evicted and freed_bytes
+        """
+        os.makedirs(self.media_dir, exist_ok=True)
+        with file_lock(self.log_path):
+            log = self._load_log()
+            last_used = log.setdefault("last_used", {})
+            now = time.time()
+            for path in partial_movies_of(file_writer):
+                last_used[path] = now
+            evicted, freed = self._evict(last_used)
+            calls = self.hits + self.misses
+            stats = {"scene": scene_name, "time": now, "hits": self.hits, "misses": self.misses,
+                     "hit_rate": self.hits / calls if calls else 0.0, "evicted": len(evicted), "freed_bytes": freed}
+            log["renders"] = (log.get("renders", []) + [stats])[-HISTORY:]
+            atomic_write(self.log_path, json.dumps(log, indent=4).encode())
+        logger.info("partial movie cache: {hits} hits, {misses} misses ({hit_rate:.0%}), "
+                    "{evicted} evicted ({freed_bytes} bytes)".format(**stats))
+        return stats
+
+    def enforce(self, dry_run: bool = False) -> Tuple[List[str], int]:
+        """
+        evict without a render, see record()
+        """
+        with file_lock(self.log_path):
+            log = self._load_log()
+            evicted, freed = self._evict(log.setdefault("last_used", {}), dry_run)
+            if not dry_run:
+                atomic_write(self.log_path, json.dumps(log, indent=4).encode())
+        return evicted, freed
+
+    def _evict(self, last_used: Dict[str, float], dry_run: bool = False) -> Tuple[List[str], int]:
+        entries = self.entries()
+        existing = {path for path, _, _ in entries}
+        for path in list(last_used):
+            if path not in existing:
+                del last_used[path]
+        protected = self.protected()
+        total = sum(size for _, size, _ in entries)
+        # least recently used first, files from before the log existed count as used when they were written
+        candidates = sorted((last_used.get(path, mtime), path, size) for path, size, mtime in entries
+                            if path not in protected)
+        cutoff = time.time() - self.max_age_days * 86400 if self.max_age_days is not None else None
+        evicted = []
+        freed = 0
+        for used, path, size in candidates:
+            too_old = cutoff is not None and used < cutoff
+            over_budget = self.budget is not None and total - freed > self.budget
+            if not (too_old or over_budget):
+                continue
+            if not dry_run:
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                last_used.pop(path, None)
+            evicted.append(path)
+            freed += size
+        return evicted, freed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="evict partial movie files over a byte budget, across all scenes")
+    parser.add_argument("--budget", type=parse_size, default=_env_budget(), help="e.g. 20G")
+    parser.add_argument("--max-age-days", type=float, default=_env_max_age())
+    parser.add_argument("--dry-run", action="store_true", help="only print what would be evicted")
+    args = parser.parse_args()
+    cache = MovieCache(budget=args.budget, max_age_days=args.max_age_days)
+    total = sum(size for _, size, _ in cache.entries())
+    evicted, freed = cache.enforce(args.dry_run)
+    for path in evicted:
+        print(("would evict " if args.dry_run else "evicted ") + path)
+    print(f"{total} bytes cached, {len(evicted)} files ({freed} bytes) {'to evict' if args.dry_run else 'evicted'}")
@@ -0,0 +1,74 @@
+"""
+render one scene from scene.py with its sections spread over a pool of worker processes.
+
+every worker runs the whole construct(), but only renders and encodes the sections of its own shard (see
+PascalScene), and renders into its own media dir so nothing collides. the section videos of all workers are then
+moved into allsections/<scene>/ with one Scene.json in the original section order, which is what mergesections.py reads.
+
+usage: python parallelrender.py Scene [-w WORKERS] [-q l|m|h|p|k]
+"""
+import argparse
+import json
+import os
+import shutil
+from multiprocessing import Pool
+from typing import Tuple
+
+QUALITIES = {
+    "l": "low_quality",
+    "m": "medium_quality",
+    "h": "high_quality",
+    "p": "production_quality",
+    "k": "fourk_quality",
+}
+
+
+def render_shard(scene_name: str, shard: int, workers: int, quality: str) -> Tuple[str, str]:
+    """
+    render the sections of one shard
+    :return: (directory the section videos were written to, name of its json index without extension)
+    """
+    os.environ["PASCALMANIM_SECTIONS"] = f"{shard}/{workers}"
+    from manim import tempconfig
+
+    import scene
+    with tempconfig({"quality": QUALITIES[quality], "save_sections": True, "progress_bar": "none",
+                     "media_dir": os.path.join("media", "shards", str(shard))}):
+        sc = getattr(scene, scene_name)()
+        sc.render()
+        return str(sc.renderer.file_writer.sections_output_dir), sc.renderer.file_writer.output_name
+
+
+def render(scene_name: str, workers: int, quality: str, outdir: str):
+    if os.path.isdir(outdir):
+        shutil.rmtree(outdir)
+    os.makedirs(outdir)
+    # the shards can't prefetch themselves from inside the pool, see texcache.prefetch
+    import texcache
+    texcache.install()
+    texcache.prefetch(scene_name)
+    # what every shard shares goes here instead of their own media dirs, see sharedfiles.py
+    from manim import config
+    os.environ["PASCALMANIM_MEDIA_ROOT"] = os.path.abspath(config.media_dir)
+    with Pool(workers, maxtasksperchild=1) as pool:
+        results = pool.starmap(render_shard, [(scene_name, shard, workers, quality) for shard in range(workers)])
+    sections = []
+    for sections_dir, output_name in results:
+        with open(os.path.join(sections_dir, f"{output_name}.json")) as f:
+            shard_sections = json.load(f)
+        for section in shard_sections:
+            shutil.move(os.path.join(sections_dir, section["video"]), os.path.join(outdir, section["video"]))
+        sections += shard_sections
+    # manim numbers the section videos by their position in the whole scene, skipped sections included
+    sections.sort(key=lambda s: s["video"])
+    with open(os.path.join(outdir, f"{results[0][1]}.json"), "w+") as f:
+        json.dump(sections, f, indent=4)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="render the sections of a scene in parallel")
+    parser.add_argument("scene", help="name of the scene class in scene.py")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count())
+    parser.add_argument("-q", "--quality", choices=QUALITIES, default="h")
+    args = parser.parse_args()
+    render(args.scene, args.workers, args.quality, os.path.join("allsections", args.scene))
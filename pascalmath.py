@@ -0,0 +1,356 @@
+"""
+the math behind the scenes: pascal's triangle rows, generalized binomials, residues and the labels of their values.
+
+nothing here needs manim, and the heavy backends (gmpy2, scipy, sympy) are only imported the first time something
+actually uses them, see backend(). a render worker only pays for what its scene reaches, sympy for example is only
+needed by hybrid()'s fallback for negative and complex arguments.
+"""
+import atexit
+import collections
+import functools
+import importlib
+import inspect
+import json
+import logging
+import math
+import os
+import sys
+import types
+import typing
+from fractions import Fraction
+from typing import List, Optional
+
+import numpy as np
+
+# the logger manim logs to, without importing manim for it
+logger = logging.getLogger("manim")
+
+
+@functools.cache
+def backend(name: str) -> types.ModuleType:
+    """
+    import a module the first time it's asked for, e.g. backend("scipy.special").gammaln
+    """
+    return importlib.import_module(name)
+
+
+number = typing.Union[float, int, complex]
+
+
+def is_integer(n: number) -> bool:
+    if isinstance(n, complex):
+        return False
+    return int(n) == n
+
+
+def canonical_number(n: number) -> number:
+    """
+    map equivalent numbers onto one representation so they share cache entries,
+    e.g. 3.0 -> 3, (2+0j) -> 2, numpy scalars -> python numbers
+    """
+    if isinstance(n, np.generic):
+        n = n.item()
+    if isinstance(n, complex):
+        if n.imag != 0:
+            return n
+        n = n.real
+    if isinstance(n, float) and n.is_integer():
+        return int(n)
+    return n
+
+
+class BoundedCache:
+    """
+    LRU memoization with a size bound and hit/miss/eviction counters, used instead of functools.cache for functions
+    that get swept over float and complex arguments which rarely repeat.
+    arguments are passed through canonical_number before lookup, and the function is called with the canonical ones.
+    keyword and left out arguments are bound to the function's signature first, so f(0.5), f(0.5, 5) and
+    f(0.5, max_len=5) share an entry. the function can't take *args or **kwargs.
+    """
+
+    def __init__(self, func: typing.Callable, maxsize: int):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.maxsize = maxsize
+        self._signature = inspect.signature(func)
+        self._arity = len(self._signature.parameters)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: typing.OrderedDict[tuple, typing.Any] = collections.OrderedDict()
+
+    def __call__(self, *args, **kwargs):
+        # binding is only needed off the common path of every argument passed positionally
+        if kwargs or len(args) != self._arity:
+            bound = self._signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            args = tuple(bound.arguments.values())
+        key = tuple(canonical_number(a) for a in args)
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            value = self.func(*key)
+            self._entries[key] = value
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return value
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        calls = self.hits + self.misses
+        return {"function": self.__name__, "maxsize": self.maxsize, "size": len(self._entries), "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions, "hit_rate": self.hits / calls if calls else 0.0}
+
+    def cache_clear(self):
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+
+def bounded_cache(maxsize: int) -> typing.Callable[[typing.Callable], BoundedCache]:
+    return lambda func: BoundedCache(func, maxsize)
+
+
+def dump_cache_stats(*caches: BoundedCache, path: Optional[str] = None):
+    """
+    log the counters of every given cache, and also write them to path as json if supplied
+    """
+    stats = [cache.stats() for cache in caches]
+    for s in stats:
+        logger.info("{function} cache: {hits} hits, {misses} misses, {evictions} evictions, "
+                    "{size}/{maxsize} entries".format(**s))
+    if path:
+        with open(path, "w+") as f:
+            json.dump(stats, f, indent=4)
+
+
+@bounded_cache(int(os.environ.get("PASCALMANIM_HYBRID_CACHE_SIZE", 4096)))
+def hybrid(n: number, k: number) -> number:
+    # my own custom hybrid solution
+    if is_integer(n) and is_integer(k):
+        return int(backend("gmpy2").comb(int(n), int(k)))
+    elif n > 0 and not (isinstance(n, complex) or isinstance(k, complex)):
+        return backend("scipy.special").binom(n, k)
+    else:
+        # sadly inaccurate for negative decimals
+        # return (-1 ** k) * hybrid(-n + k - 1, k)
+        out = backend("sympy").binomial(n, k)
+        if out.is_complex:
+            return complex(out)
+        else:
+            return float(out)
+
+
+@atexit.register
+def _dump_hybrid_stats():
+    # PASCALMANIM_CACHE_STATS can point at a json file to write the counters to
+    caches = [cache for cache in (hybrid, tex_format_num) if cache.hits or cache.misses]
+    if caches:
+        dump_cache_stats(*caches, path=os.environ.get("PASCALMANIM_CACHE_STATS"))
+
+
+# every entry of rows 0..66 fits in an int64, past that the entries have to be python big ints
+INT64_MAX_ROW = 66
+
+
+def _row_dtype(n: int) -> type:
+    return np.int64 if n <= INT64_MAX_ROW else object
+
+
+def exact_pascal_row(n: int) -> np.ndarray:
+    """
+    row n of pascal's triangle with exact integer entries
+    :param n: a natural row index
+    :return: an int64 array for small rows, an object array of python ints past INT64_MAX_ROW
+    """
+    row = np.empty(n + 1, dtype=_row_dtype(n))
+    c = backend("gmpy2").mpz(1)
+    for k in range((n >> 1) + 1):
+        row[k] = row[n - k] = int(c)
+        c = c * (n - k) // (k + 1)
+    return row
+
+
+def iter_pascal_rows(start: int = 0, stop: Optional[int] = None,
+                     modulus: Optional[int] = None) -> typing.Iterator[np.ndarray]:
+    """
+    stream rows start, start+1, ... of pascal's triangle, only ever holding the previous row.
+    only the first row is computed directly, every row after it is one vectorized add of the previous row.
+    :param start: first row index (inclusive)
+    :param stop: last row index (exclusive), None to go on forever
+    :param modulus: if supplied, yield the rows mod modulus in the smallest unsigned dtype that fits, so they never
+        need big ints
+    :return: rows as returned by exact_pascal_row, or residue arrays
+    """
+    if stop is not None and start >= stop:
+        return
+    prev = exact_pascal_row(start)
+    if modulus is not None:
+        dtype = np.min_scalar_type(2 * (modulus - 1))
+        prev = (prev % modulus).astype(dtype)
+    yield prev
+    n = start + 1
+    while stop is None or n < stop:
+        row = np.empty(n + 1, dtype=prev.dtype if modulus is not None else _row_dtype(n))
+        if prev.dtype != row.dtype:
+            # promote before adding so the first big int row doesn't overflow
+            prev = prev.astype(object)
+        row[0] = row[n] = 1 % modulus if modulus is not None else 1
+        np.add(prev[1:], prev[:-1], out=row[1:n])
+        if modulus is not None:
+            np.remainder(row, modulus, out=row)
+        yield row
+        prev = row
+        n += 1
+
+
+def pascal_rows(start: int, stop: int) -> List[np.ndarray]:
+    """
+    exact rows start..stop-1 of pascal's triangle in one batched call, see iter_pascal_rows
+    :param start: first row index (inclusive)
+    :param stop: last row index (exclusive)
+    :return: list of rows as returned by exact_pascal_row
+    """
+    return list(iter_pascal_rows(start, stop))
+
+
+def extended_pascal_block(rows: int, cols: int) -> np.ndarray:
+    """
+    C(n, k) for every row n in -rows..rows and column k in 0..cols of the triangle extended to negative rows, with
+    nothing but integer additions.
+    row 0 is 1, 0, 0, ..., the rows below it come from C(n + 1, k) = C(n, k) + C(n, k - 1) and the rows above it
+    from the same identity turned around, C(n, k) = C(n + 1, k) - C(n, k - 1), which unrolls into an alternating
+    cumulative sum of the row below.
+    :return: (2 * rows + 1, cols + 1) array, block[rows + n, k] is C(n, k). int64 if every entry fits, otherwise
+        python ints
+    """
+    # |C(n, k)| is at most C(rows + cols, cols) for every entry, negative rows included
+    dtype = np.int64 if math.comb(rows + cols, cols) <= np.iinfo(np.int64).max else object
+    block = np.zeros((2 * rows + 1, cols + 1), dtype=dtype)
+    block[rows, 0] = 1
+    for i in range(rows + 1, 2 * rows + 1):
+        block[i, 0] = 1
+        np.add(block[i - 1, 1:], block[i - 1, :-1], out=block[i, 1:])
+    signs = np.where(np.arange(cols + 1) % 2, -1, 1).astype(dtype)
+    for i in range(rows - 1, -1, -1):
+        block[i] = signs * np.cumsum(signs * block[i + 1])
+    return block
+
+
+def generalized_binomial_row(n: number, count: int, bits: Optional[int] = None) -> np.ndarray:
+    """
+    the first count coefficients C(n, 0), C(n, 1), ... of any real or complex row in one pass, using the recurrence
+    C(n, k+1) = C(n, k) * (n - k) / (k + 1)
+    :param n: the row, doesn't have to be natural
+    :param count: how many coefficients to compute
+    :param bits: if supplied, evaluate with gmpy2 mpfr/mpc at this many bits of precision instead of float/complex
+    :return: a float or complex array, or an object array of mpfr/mpc if bits was supplied
+    """
+    if count <= 0:
+        return np.empty(0, dtype=object if bits else complex if isinstance(n, complex) else float)
+    if bits is None:
+        k = np.arange(count - 1, dtype=float)
+        factors = (n - k) / (k + 1)
+        out = np.empty(count, dtype=factors.dtype)
+        out[0] = 1
+        np.cumprod(factors, out=out[1:])
+        return out
+    gmpy2 = backend("gmpy2")
+    out = np.empty(count, dtype=object)
+    with gmpy2.local_context(precision=bits):
+        n = gmpy2.mpc(n) if isinstance(n, complex) else gmpy2.mpfr(n)
+        c = n ** 0
+        for k in range(count):
+            out[k] = c
+            c = c * (n - k) / (k + 1)
+    return out
+
+
+def pascal_row(rowIndex: number, precision: int = 10) -> List[number]:
+    if is_integer(rowIndex) and rowIndex >= 0:
+        return exact_pascal_row(int(rowIndex)).tolist()
+    else:
+        return generalized_binomial_row(rowIndex, precision).tolist()
+
+
+def lucas_residues(n: np.ndarray, k: np.ndarray, p: int = 2) -> np.ndarray:
+    """
+    C(n, k) mod p elementwise over broadcast arrays of natural n and k, with lucas' theorem: C(n, k) mod p is the
+    product of C(n_i, k_i) mod p over the base p digits of n and k. for p = 2 that is just k & ~n == 0.
+    :param p: a prime
+    :return: array of residues, 0 where k > n
+    """
+    if not backend("gmpy2").is_prime(p):
+        raise ValueError(f"lucas' theorem needs a prime modulus, not {p}")
+    n = np.asarray(n, dtype=np.int64)
+    k = np.asarray(k, dtype=np.int64)
+    if p == 2:
+        return ((k & ~n) == 0).astype(np.uint8)
+    # C(a, b) mod p for single digits, 0 when b > a
+    digit_table = np.array([[math.comb(a, b) % p for b in range(p)] for a in range(p)], dtype=np.int64)
+    out = np.ones(np.broadcast(n, k).shape, dtype=np.int64)
+    while n.any() or k.any():
+        out = out * digit_table[n % p, k % p] % p
+        n = n // p
+        k = k // p
+    return out.astype(np.uint8) if p < 256 else out
+
+
+def binomial_residues(rows: int, p: int = 2, cols: Optional[int] = None, first_row: int = 0) -> np.ndarray:
+    """
+    C(n, k) mod p for a whole block of the triangle at once, see lucas_residues
+    :param rows: how many rows
+    :param p: a prime
+    :param cols: how many columns, defaults to rows
+    :param first_row: row index of the first row of the block
+    :return: (rows, cols) array of residues, 0 where k > n
+    """
+    cols = rows if cols is None else cols
+    n = np.arange(first_row, first_row + rows, dtype=np.int64)[:, np.newaxis]
+    k = np.arange(cols, dtype=np.int64)[np.newaxis, :]
+    return lucas_residues(n, k, p)
+
+
+@bounded_cache(4096)
+def tex_format_num(num: number, max_len: int = 5) -> str:
+    if is_integer(num):
+        return sys.intern(str(int(num)))
+    if isinstance(num, complex):
+        return sys.intern(f"{tex_format_num(num.real, max_len)}+{tex_format_num(num.imag, max_len)}i")
+    # the closest fraction that fits in max_len digits, Fraction(num) of a float is the exact binary value
+    # with a huge power of 2 as denominator, so that's never the one that gets shown
+    frac = Fraction(num).limit_denominator(10 ** max_len - 1)
+    if len(str(abs(frac.numerator))) > max_len or not math.isclose(frac, num, rel_tol=1e-9, abs_tol=1e-12):
+        return sys.intern(str(round(num, max_len - 2)))
+    elif frac.denominator == 1:
+        # within the tolerance of a whole number, e.g. tiny values or float error around an integer
+        return sys.intern(str(frac.numerator))
+    else:
+        return sys.intern(r"\frac{" + str(frac.numerator) + "}{" + str(frac.denominator) + "}")
+
+
+def tex_format_row(row: typing.Iterable[number], max_len: int = 5) -> List[str]:
+    """
+    tex_format_num of a whole row at once, every distinct value is only formatted once and equal labels are the
+    same str object
+    """
+    values = np.asarray(row)
+    if values.dtype == object:
+        return [tex_format_num(v, max_len) for v in values.tolist()]
+    unique, inverse = np.unique(values, return_inverse=True)
+    labels = [tex_format_num(v, max_len) for v in unique.tolist()]
+    return [labels[i] for i in inverse.ravel()]
+
+
+def tex_label_stats(grid: typing.Iterable[typing.Iterable[str]]) -> typing.Dict[str, int]:
+    """
+    how many labels a grid of tex strings has, and how many of those are distinct, i.e. how many TeX compiles it
+    actually needs
+    """
+    counts = collections.Counter(label for row in grid for label in row)
+    stats = {"labels": sum(counts.values()), "unique": len(counts)}
+    logger.info("{labels} labels, {unique} unique TeX strings".format(**stats))
+    return stats
@@ -0,0 +1,97 @@
+import os
+from typing import Optional, Tuple
+
+from manim import DefaultSectionType, MovingCameraScene
+
+import texcache
+from instrumentation import MemoryTracker, SectionTimer
+from moviecache import MovieCache
+from stillframes import StillFrames
+
+texcache.install()
+
+
+def parse_shard(spec: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    parse a PASCALMANIM_SECTIONS value
+    :param spec: "shard/workers", e.g. "2/8" renders sections 2, 10, 18, ...
+    :return: (shard, workers), or None to render every section
+    """
+    if not spec:
+        return None
+    shard, workers = (int(s) for s in spec.split("/"))
+    if not 0 <= shard < workers:
+        raise ValueError(f"shard {shard} out of range for {workers} workers")
+    return shard, workers
+
+
+class PascalScene(MovingCameraScene):
+    """
+    base for every scene in scene.py, hooks the render pipeline around construct()
+
+    if PASCALMANIM_SECTIONS is set, only the sections of that shard get rendered, every other section still runs so
+    the scene state is right when the next rendered one starts, but with skip_animations so nothing gets encoded.
+    section 0 is the one manim creates before the first next_section() call.
+
+    every section is also timed, and with PASCALMANIM_MEMORY=1 its memory use tracked, see instrumentation.py. waits
+    where nothing moves are encoded from a single frame, see stillframes.py. the partial movie cache of all scenes is
+    kept to one byte budget, see moviecache.py.
+    """
+
+    def setup(self):
+        super().setup()
+        self.section_index = 0
+        self.section_shard = parse_shard(os.environ.get("PASCALMANIM_SECTIONS"))
+        if not self.renders_section(0):
+            first = self.renderer.file_writer.sections[-1]
+            first.skip_animations = True
+            # manim named its video already, left set it gets concatenated from no partial movies and probed
+            first.video = None
+        self.section_timer = SectionTimer(self.renderer.file_writer)
+        self.section_timer.start_section(0)
+        self.still_frames = StillFrames(self.renderer, on_hold=self.section_timer.hold)
+        self.movie_cache = MovieCache.from_env()
+        self.movie_cache.watch(self.renderer.file_writer)
+        self.memory_tracker = MemoryTracker(self) if os.environ.get("PASCALMANIM_MEMORY") else None
+        if self.memory_tracker:
+            self.memory_tracker.start_section(0, self.renderer.file_writer.sections[-1].name)
+        texcache.start_recording()
+        texcache.prefetch(type(self).__name__)
+
+    def tear_down(self):
+        texcache.save_manifest(type(self).__name__)
+        self.section_timer.finish()
+        if self.memory_tracker:
+            self.memory_tracker.finish()
+        super().tear_down()
+
+    def render(self, preview: bool = False):
+        result = super().render(preview)
+        # the section index only gets written once the render is finished
+        self.section_timer.write()
+        self.movie_cache.record(self.renderer.file_writer, type(self).__name__)
+        if self.memory_tracker:
+            self.memory_tracker.write(self.renderer.file_writer)
+        return result
+
+    def renders_section(self, index: int) -> bool:
+        if self.section_shard is None:
+            return True
+        shard, workers = self.section_shard
+        return index % workers == shard
+
+    def next_section(self, name: str = "unnamed", type: str = DefaultSectionType.NORMAL,
+                     skip_animations: bool = False):
+        self.section_index += 1
+        super().next_section(name, type, skip_animations or not self.renders_section(self.section_index))
+        self.section_timer.start_section(self.section_index)
+        if self.memory_tracker:
+            self.memory_tracker.start_section(self.section_index, name)
+
+    def play(self, *args, **kwargs):
+        with self.section_timer.timing("play", len(args)):
+            super().play(*args, **kwargs)
+
+    def wait(self, *args, **kwargs):
+        with self.section_timer.timing("wait"):
+            super().wait(*args, **kwargs)
@@ -1,51 +1,20 @@
+import collections
 import functools
 import math
-from fractions import Fraction
+import os
 
-import gmpy2
-import sympy
 from manim import *
-from scipy.special import binom as scipybinom
 
-number = typing.Union[float, int, complex]
-
-
-def is_integer(n: number) -> bool:
-    if isinstance(n, complex):
-        return False
-    return int(n) == n
-
-
-@functools.cache
-def hybrid(n: number, k: number) -> number:
-    # my own custom hybrid solution
-    if is_integer(n) and is_integer(k):
-        return int(gmpy2.comb(int(n), int(k)))
-    elif n > 0 and not (isinstance(n, complex) or isinstance(k, complex)):
-        return scipybinom(n, k)
-    else:
-        # sadly inaccurate for negative decimals
-        # return (-1 ** k) * hybrid(-n + k - 1, k)
-        out = sympy.binomial(n, k)
-        if out.is_complex:
-            return complex(out)
-        else:
-            return float(out)
-
-
-def pascal_row(rowIndex: number, precision: int = 10):
-    if is_integer(rowIndex) and rowIndex >= 0:
-        rowIndex: int
-        # https://medium.com/@duhroach/fast-fun-with-pascals-triangle-6030e15dced0
-        row = [0] * (rowIndex + 1)
-        row[0] = row[rowIndex] = 1
-        for i in range(0, rowIndex >> 1):
-            x = row[i] * (rowIndex - i) / (i + 1)
-
-            row[i + 1] = row[rowIndex - 1 - i] = x
-        return row
-    else:
-        return [hybrid(rowIndex, i) for i in range(precision)]
+from batchtransform import BatchTransform
+from fibonacci import fib, fib_ratios
+from glyphs import number_label, number_row
+from pascalmath import (binomial_residues, exact_pascal_row, extended_pascal_block, lucas_residues, pascal_rows,
+                        tex_format_row, tex_label_stats)
+from pascalscene import PascalScene
+from sharedfiles import file_lock, media_root
+from trianglegrid import CELL_PITCH, TriangleGrid
+from trianglelod import TriangleLOD, log_binomial_heatmap
+from trianglestore import TriangleStore
 
 
 def only_numeric_subobjects(mobj: MathTex) -> List[SingleStringMathTex]:
@@ -69,18 +38,13 @@ def split_text_by_word(text: Text) -> List[VGroup]:
     return out
 
 
-def fib(n):
-    a, b = 1, 1
-    for _ in range(n):
-        a, b = b, a + b
-    return a
-
-
 def animate_math(scene: Scene, transforms: List[typing.Tuple[str, str]], **mathtexparams) -> MathTex:
     eq = MathTex(transforms[0][0], **mathtexparams)
-    for old, new in transforms:
-        scene.remove(eq)
-        eq = MathTex(old, **mathtexparams)
+    for i, (old, new) in enumerate(transforms):
+        if i > 0:
+            # regroup the last result by the substrings this step isolates
+            scene.remove(eq)
+            eq = MathTex(old, **mathtexparams)
         scene.add(eq)
         neweq = MathTex(new, **mathtexparams)
         scene.play(TransformMatchingTex(eq, neweq))
@@ -88,7 +52,12 @@ def animate_math(scene: Scene, transforms: List[typing.Tuple[str, str]], **matht
     return eq
 
 
-class Scene(MovingCameraScene):
+class Scene(PascalScene):
+    # the extended triangle in "redefine pascal's triangle" covers rows -extended_rows..extended_rows and the negative
+    # rows are extended_cols entries long
+    extended_rows = 5
+    extended_cols = 15
+
     def construct(self):
         self.next_section("(x+1)^2")
         transforms = [
@@ -335,62 +304,117 @@ class Scene(MovingCameraScene):
 
         pascal_tri = []
         pascal_nums = []
-        for row in range(-5, 6):
-            row = pascal_row(row, precision=15)
+        extended_rows = self.extended_rows
+        block = extended_pascal_block(extended_rows, self.extended_cols - 1)
+        # rows from 0 down stop where the triangle does
+        labels = [tex_format_row(block[i] if i < extended_rows else block[i, :i - extended_rows + 1])
+                  for i in range(len(block))]
+        tex_label_stats(labels)
+        # one MathTex per distinct label, every other cell with the same label gets a copy
+        label_mobjects = {label: MathTex(label) for label in set().union(*labels)}
+        for row in labels:
             rowl = [Square()]
             nums = []
             if pascal_tri:
                 rowl[0].next_to(pascal_tri[-1][0], DOWN, 0).shift(LEFT)
-            num = fit_mobject_within_another(MathTex(tex_format_num(row[0])), rowl[0], 0.5)
+            num = fit_mobject_within_another(label_mobjects[row[0]].copy(), rowl[0], 0.5)
             nums.append(num)
-            for i in row[1:]:
+            for label in row[1:]:
                 sq = Square().next_to(rowl[-1], RIGHT, 0)
-                num = fit_mobject_within_another(MathTex(tex_format_num(i)), sq, 0.5)
+                num = fit_mobject_within_another(label_mobjects[label].copy(), sq, 0.5)
                 nums.append(num)
                 rowl.append(sq)
             pascal_tri.append(rowl)
             pascal_nums.append(VGroup(*nums))
         pascal_nums = VGroup(*pascal_nums)
         fit_mobject_within_another(pascal_nums, self.camera.frame, 1)
-        pascal_nums.shift(ORIGIN - pascal_nums[5][0].get_center())  # move row 0 to center
+        pascal_nums.shift(ORIGIN - pascal_nums[extended_rows][0].get_center())  # move row 0 to center
         formula1 = faceqsimp[1::2]
-        self.play(Write(pascal_nums[5:]),
-                  *[Transform(formula1[i], pascal_nums[4][i]) for i in range(len(formula1))],
+        self.play(Write(pascal_nums[extended_rows:]),
+                  *[Transform(formula1[i], pascal_nums[extended_rows - 1][i]) for i in range(len(formula1))],
                   *[FadeOut(obj) for obj in faceqsimp[::2]],
                   Unwrite(nem1)
                   )
-        self.play(Write(VGroup(*pascal_nums[4].submobjects[len(formula1):])))
+        self.play(Write(VGroup(*pascal_nums[extended_rows - 1].submobjects[len(formula1):])))
         self.wait()
         self.next_section("continue the pattern")
-        self.play(Write(pascal_nums[3::-1]))
+        self.play(Write(pascal_nums[extended_rows - 2::-1]))
         self.wait()
         self.next_section("triangle is just rotated")
-        protate = pascal_nums[5:].copy().rotate(TAU / 3, OUT, pascal_nums[5].get_center()) \
-            .shift(pascal_nums[4][0].get_center() - pascal_nums[5].get_center()).set_fill(opacity=0).set_stroke(
+        row0 = pascal_nums[extended_rows]
+        protate = pascal_nums[extended_rows:].copy().rotate(TAU / 3, OUT, row0.get_center()) \
+            .shift(pascal_nums[extended_rows - 1][0].get_center() - row0.get_center()).set_fill(opacity=0).set_stroke(
             opacity=0)
         [[num.rotate(-TAU / 3) for num in row] for row in protate]
-        transforms = []
-        for i, row in enumerate(pascal_nums[5:]):
-            for j, num in enumerate(row):
-                transforms.append(Transform(num.copy(), protate[i][j], path_arc=PI))
-        self.play(*transforms)
+        self.play(BatchTransform(((num.copy(), protate[i][j]) for i, row in enumerate(pascal_nums[extended_rows:])
+                                  for j, num in enumerate(row)), path_arc=PI))
         self.wait()
 
 
-def tex_format_num(num: number, max_len: int = 5) -> str:
-    if is_integer(num):
-        return str(int(num))
-    if isinstance(num, complex):
-        return f"{tex_format_num(num.real, max_len)}+{tex_format_num(num.imag, max_len)}i"
-    frac = Fraction(num)
-    if len(str(frac.numerator)) > max_len or len(str(frac.denominator)) > max_len:
-        return str(round(num, max_len - 2))
-    else:
-        return r"\frac{" + str(frac.numerator) + "}{" + str(frac.denominator) + "}"
+@functools.cache
+def glyph_paths(tex: str) -> typing.Tuple[Optional[str], ...]:
+    """
+    path strings of the glyphs of a SingleStringMathTex, memoized so probe strings only get built once
+    """
+    return tuple(getattr(ts, "path_string", None) for ts in SingleStringMathTex(tex).submobjects)
+
+
+class GlyphMatcher:
+    """
+    aho-corasick automaton over glyph path strings, finds every occurrence of any of the patterns in a single pass
+    over the glyphs. path strings are python strings so each one's hash is only computed once.
+    """
+
+    def __init__(self, patterns: typing.Sequence[typing.Sequence[Optional[str]]]):
+        self.lengths = [len(p) for p in patterns]
+        self.goto: List[typing.Dict[Optional[str], int]] = [{}]
+        self.fail = [0]
+        # indices of the patterns that end in each state
+        self.out: List[List[int]] = [[]]
+        for p, pattern in enumerate(patterns):
+            state = 0
+            for path in pattern:
+                if path not in self.goto[state]:
+                    self.goto[state][path] = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = self.goto[state][path]
+            self.out[state].append(p)
+        # breadth first so the failure state of a node is always done before the node itself
+        queue = collections.deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for path, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and path not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(path, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def match_starts(self, stream: typing.Iterable[Optional[str]]) -> typing.Set[int]:
+        """
+        :return: every index of stream at which one of the patterns starts
+        """
+        starts = set()
+        state = 0
+        for i, path in enumerate(stream):
+            while state and path not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(path, 0)
+            for p in self.out[state]:
+                starts.add(i - self.lengths[p] + 1)
+        return starts
+
+
+@functools.cache
+def glyph_matcher(*patterns: str) -> GlyphMatcher:
+    return GlyphMatcher([glyph_paths(p) for p in patterns])
 
 
 def transform_tex_symbols(mobj: MathTex, symbol_to_replace: str, target_symbol: str,
-                          intermediary: Optional[str] = None) -> typing.Tuple[List[Mobject], MathTex, List[Transform]]:
+                          intermediary: Optional[str] = None) -> typing.Tuple[List[Mobject], MathTex, List[Animation]]:
     """
     transform a specific symbol in a MathTex object into another without transforming anything else
     :param mobj: the mathtex object
@@ -398,17 +422,15 @@ def transform_tex_symbols(mobj: MathTex, symbol_to_replace: str, target_symbol:
     :param target_symbol: the TeX to replace it with.
     :param intermediary: if supplied, it will replace the tex of the intermediary with the symbol_to_replace, and then
         transform only the ones which were originally the intermediary. useful for avoiding wrong replacements.
-    :return: (list of the texsymbols on the screen, the finaltransformed MathTex, a list of Transformations)
+    :return: (list of the texsymbols on the screen, the finaltransformed MathTex, a list of animations to play)
     """
     # init vars
     # for some reason the exponent path strings are different
-    symbols_to_search: List[List[TexSymbol]] = [SingleStringMathTex(intermediary or symbol_to_replace).submobjects,
-                                                SingleStringMathTex("^{" + (intermediary or symbol_to_replace) + "}")
-                                                    .submobjects]
-    symbols_to_replace: List[List[TexSymbol]] = [SingleStringMathTex(symbol_to_replace).submobjects,
-                                                 SingleStringMathTex("^{" + symbol_to_replace + "}")
-                                                     .submobjects]
-    target_tex_symbols = SingleStringMathTex(target_symbol).submobjects
+    search = intermediary or symbol_to_replace
+    matcher = glyph_matcher(search, "^{" + search + "}")
+    search_len = len(glyph_paths(search))
+    replace_len = len(glyph_paths(symbol_to_replace))
+    target_len = len(glyph_paths(target_symbol))
     # "normalize" mobj
     mobj.become(MathTex(mobj.tex_string), match_height=True, match_center=True)
     if intermediary:
@@ -423,75 +445,93 @@ def transform_tex_symbols(mobj: MathTex, symbol_to_replace: str, target_symbol:
     scene_mobjects = []
     # for every subobject of MathTex (singlestringmathtex)
     for i, tx in enumerate(mobj.submobjects):
+        # every glyph index at which the symbol (or its exponent version) starts
+        match_starts = matcher.match_starts(getattr(ts, "path_string", None) for ts in tx.submobjects)
         mobj_symbol_index = 0
         mobj_transform_index = 0
         target_symbol_index = 0
         # for every subobject of the singlestring (texobject)
         while mobj_symbol_index < len(tx.submobjects):
-            # will be set true if any match
-            index_matches = False
-            for sequence in symbols_to_search:
-                # path strings of the sequence we want to look for
-                target_path_strings = [getattr(ts, "path_string", None) for ts in sequence]
-                # create a list of path_strings matching the length and current index
-                mobj_path_strings = [getattr(ts, "path_string", None) for ts in
-                                     tx.submobjects[mobj_symbol_index:mobj_symbol_index + len(sequence)]]
-                if target_path_strings == mobj_path_strings:
-                    index_matches = True
-                    break
             # if the symbol(s) match the one(s) we want to replace
-            if index_matches:
+            if mobj_symbol_index in match_starts:
                 # collect all of the mobj symbols to transform into a group
                 mobj_group = VGroup(*mobj_to_transform.submobjects[i]
-                                    .submobjects[
-                                     mobj_transform_index:mobj_transform_index + len(symbols_to_replace[0])])
-                mobj_transform_index += len(symbols_to_replace[0])
-                mobj_symbol_index += len(symbols_to_search[0])
+                                    .submobjects[mobj_transform_index:mobj_transform_index + replace_len])
+                mobj_transform_index += replace_len
+                mobj_symbol_index += search_len
                 # do the same for the target symbols
-                target_group = VGroup(*target.submobjects[i][target_symbol_index:
-                                                             target_symbol_index + len(target_tex_symbols)])
-                target_symbol_index += len(target_tex_symbols)
+                target_group = VGroup(*target.submobjects[i][target_symbol_index:target_symbol_index + target_len])
+                target_symbol_index += target_len
                 # and then transform the symbol into the target(s)
-                transforms.append(Transform(mobj_group, target_group))
+                transforms.append((mobj_group, target_group))
                 # add created group to vgroup to return
                 scene_mobjects.append(mobj_group)
             # if the symbol does not match
             else:
                 # transform it into its matching symbol on the target, since the path is the same it should just move
                 # and scale
-                transforms.append(Transform(mobj_to_transform.submobjects[i].submobjects[mobj_transform_index],
-                                            target.submobjects[i].submobjects[target_symbol_index]))
+                transforms.append((mobj_to_transform.submobjects[i].submobjects[mobj_transform_index],
+                                   target.submobjects[i].submobjects[target_symbol_index]))
                 scene_mobjects.append(mobj_to_transform.submobjects[i].submobjects[mobj_transform_index])
                 mobj_symbol_index += 1
                 mobj_transform_index += 1
                 target_symbol_index += 1
-    return scene_mobjects, target, transforms
+    # every glyph in one animation instead of a Transform each
+    return scene_mobjects, target, [BatchTransform(transforms)]
+
 
+def triangle_store(rows: int, modulus: Optional[int] = None) -> TriangleStore:
+    """
+    the first rows rows of the triangle (mod modulus), built once in the project's media dir and shared by every
+    render and parallelrender shard. only worth it for triangles too big to hold or recompute, a few rows are quicker
+    straight from pascalmath
+    """
+    directory = os.path.join(media_root(), "trianglestore")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"mod{modulus}" if modulus else "exact")
+    # the shards would otherwise all extend the same files at once
+    with file_lock(path):
+        return TriangleStore(path, rows, modulus)
+
+
+def exact_row_labels(n: int) -> List[str]:
+    """
+    the labels of row n of a TriangleLOD, built when the camera first gets to it
+    """
+    return [str(v) for v in exact_pascal_row(n)]
+
+
+class Serpinski(PascalScene):
+    num_of_rows = 16
+    # prime to highlight the residues of
+    modulus = 2
+    # with more rows than this the triangle is drawn by TriangleLOD, colored by residue
+    lod_rows = 30
 
-class Serpinski(MovingCameraScene):
     def construct(self):
-        num_of_rows = 16
+        if self.num_of_rows > self.lod_rows:
+            self.construct_lod()
+            return
+        num_of_rows = self.num_of_rows
+        modulus = self.modulus
         self.next_section("Start")
         texts = []
-        tex = Text("1", font_size=16).to_edge(UP)
+        tex = number_row([1], font_size=16).to_edge(UP)
         texts.append(tex)
         self.add(tex)
-        square = Square().to_edge(UP)
-        fit_mobject_within_another(tex, square)
-        squares = [square]
+        squares = TriangleGrid(num_of_rows, top=Square().to_edge(UP).get_center())
+        fit_mobject_within_another(tex, squares[0][0])
         self.add(tex)
+        rows = pascal_rows(0, num_of_rows)
         for i in range(1, num_of_rows):
-            newtex = Text(r"   ".join([f'{j:g}' for j in pascal_row(i)]),
-                          font_size=16).next_to(tex, DOWN)
-            newsquares = VGroup(*[Square().next_to(squares[-1], DOWN, buff=LARGE_BUFF) for _ in range(i + 1)])
-            newsquares.arrange_in_grid(cols=i + 1, rows=1, buff=LARGE_BUFF)
-            squares.append(newsquares)
+            newtex = number_row(rows[i], font_size=16).next_to(tex, DOWN)
+            newsquares = squares[i]
             texts.append(newtex)
-            onsnewtex = split_text_by_word(newtex)
+            onsnewtex = newtex.submobjects
             for i, square in enumerate(newsquares.submobjects):
                 fit_mobject_within_another(onsnewtex[i], square)
             self.add(newtex)
-        everything = VGroup(*squares)
+        everything = squares
         self.camera.frame.match_height(everything)
         self.camera.frame.rescale_to_fit(everything.length_over_dim(1) + 2, 1)
         self.camera.frame.move_to(everything)
@@ -499,12 +539,14 @@ class Serpinski(MovingCameraScene):
         self.next_section("Highlight Odds")
         pascalsquares = []
         anims = []
+        residues = binomial_residues(num_of_rows, modulus)
+        # one color per nonzero residue, just DARK_BLUE for the odd numbers when modulus is 2
+        colors = [interpolate_color(DARK_BLUE, YELLOW, r / max(modulus - 2, 1)) for r in range(modulus - 1)]
         for rown, row in enumerate(squares):
-            prow = pascal_row(rown)
             rowfills = []
             for i, square in enumerate(row):
-                if prow[i] % 2 == 1:
-                    sq: Square = square.copy().set_fill(BLUE, 1.0).set_color(DARK_BLUE)
+                if residues[rown, i]:
+                    sq: Square = square.copy().set_fill(colors[residues[rown, i] - 1], 1.0).set_stroke(DARK_BLUE)
                     pascalsquares.append(sq)
                     # sq.set_stroke(width=0)
                     rowfills.append(Create(sq))
@@ -514,22 +556,32 @@ class Serpinski(MovingCameraScene):
         self.next_section("Build Serpinski")
         base = Polygon(squares[0].get_center(), squares[-1].submobjects[0].get_center(),
                        squares[-1].submobjects[-1].get_center()).set_fill(BLUE, 1.0).set_color(DARK_BLUE)
-        tris = [base]
-        self.play(*[o.animate.scale(0) for o in pascalsquares], run_time=0.5)
-        self.play(*[AnimationGroup(*[so.animate.scale(0) for so in text.submobjects]) for text in texts], run_time=0.5)
+        self.play(BatchTransform.apply(pascalsquares, "scale", 0), run_time=0.5)
+        self.play(BatchTransform.apply([so for text in texts for so in text.submobjects], "scale", 0), run_time=0.5)
         self.play(GrowFromCenter(base), run_time=0.5)
         [self.remove(text) for text in texts]
         [self.remove(o) for o in pascalsquares]
-        for i in range(7):
-            newtris = []
-            anims = []
-            for triangle in tris:
-                triangle: Polygon
-                center, outtris = split_triangle(triangle)
-                newtris += outtris
-                anims.append(Create(center.set_fill(BLACK)))
-            self.play(*anims)
-            tris = newtris
+        # one mobject and one animation per level, so this can go a lot deeper than 7
+        for holes in sierpinski_holes(base.get_vertices(), 7):
+            self.play(DrawTriangles(Triangles(holes, fill_color=BLACK, fill_opacity=1, stroke_color=DARK_BLUE)))
+
+    def construct_lod(self):
+        modulus = self.modulus
+        # exact values get far too long to label rows this deep with, the cells show their residues instead, read at
+        # random from the store as the camera gets to them
+        store = triangle_store(self.num_of_rows, modulus)
+        triangle = TriangleLOD(self.num_of_rows, lambda n, k: lucas_residues(n, k, modulus) / max(modulus - 1, 1),
+                               lambda n: [str(r) for r in store[n]], self.camera.frame, top=UP * 3,
+                               colors=(BLACK, DARK_BLUE if modulus == 2 else YELLOW))
+        self.next_section("Start")
+        self.camera.frame.move_to(triangle.cell_center(2, 1)).scale_to_fit_height(5 * CELL_PITCH)
+        triangle.update_lod()
+        self.add(triangle)
+        self.wait(1)
+        self.next_section("Build Serpinski")
+        # the updater swaps the cells for the image by itself once they get too small
+        self.play(self.camera.auto_zoom([triangle.image], 1), run_time=4)
+        self.wait(1)
 
 
 def split_triangle(base: Polygon) -> List[Polygon]:
@@ -543,30 +595,100 @@ def split_triangle(base: Polygon) -> List[Polygon]:
     ]
 
 
-class Phi(MovingCameraScene):
+def sierpinski_holes(vertices: np.ndarray, depth: int) -> List[np.ndarray]:
+    """
+    the triangles cut out of a sierpinski triangle at every level, each level computed as one array operation
+    :param vertices: the (3, 3) corners of the base triangle
+    :param depth: how many levels to compute
+    :return: one (3 ** level, 3, 3) array of the removed middle triangles per level
+    """
+    tris = np.asarray(vertices, dtype=float)[np.newaxis]
+    holes = []
+    for _ in range(depth):
+        v0, v1, v2 = tris[:, 0], tris[:, 1], tris[:, 2]
+        m01, m12, m20 = (v0 + v1) / 2, (v1 + v2) / 2, (v2 + v0) / 2
+        holes.append(np.stack([m01, m12, m20], axis=1))
+        tris = np.concatenate([np.stack([v0, m01, m20], axis=1),
+                               np.stack([m01, v1, m12], axis=1),
+                               np.stack([m20, m12, v2], axis=1)])
+    return holes
+
+
+class Triangles(VMobject):
+    """
+    any number of separate triangles as the subpaths of a single VMobject
+    """
+
+    def __init__(self, triangles: np.ndarray, **kwargs):
+        self.triangles = triangles
+        super().__init__(**kwargs)
+
+    def generate_points(self):
+        self.draw_progress(1)
+
+    def _along_edges(self, s: float) -> np.ndarray:
+        # the point s edges along the outline of every triangle, 0 <= s <= 3
+        k = min(int(s), 2)
+        return self.triangles[:, k] + (self.triangles[:, (k + 1) % 3] - self.triangles[:, k]) * (s - k)
+
+    def draw_progress(self, alpha: float) -> "Triangles":
+        """
+        only draw the first alpha of the outline of every triangle, like Create does
+        """
+        corners = [self._along_edges(min(j, 3 * alpha)) for j in range(4)]
+        starts = np.stack(corners[:3], axis=1)[:, :, np.newaxis]
+        ends = np.stack(corners[1:], axis=1)[:, :, np.newaxis]
+        # the edges are straight lines, so the handles just sit on them
+        t = np.linspace(0, 1, 4)[:, np.newaxis]
+        self.set_points((starts + (ends - starts) * t).reshape(-1, 3))
+        return self
+
+
+class DrawTriangles(Animation):
+    """
+    Create every triangle of a Triangles at once, with one vectorized update per frame
+    """
+
+    def interpolate_mobject(self, alpha: float):
+        self.mobject.draw_progress(self.rate_func(alpha))
+
+
+class Phi(PascalScene):
+    num_of_rows = 10
+    # with more rows than this the triangle is drawn by TriangleLOD instead of a Square and Text per cell
+    lod_rows = 30
+
     def construct(self):
         self.next_section("Start")
-        num_of_rows = 10
-        texts = []
-        tex = Text("1", font_size=16).to_edge(UP)
-        texts.append(tex)
-        self.add(tex)
-        square = Square().to_edge(UP)
-        fit_mobject_within_another(tex, square)
-        squares = [square]
-        self.add(tex)
-        for i in range(1, num_of_rows):
-            newtex = Text(r"   ".join([f'{j:g}' for j in pascal_row(i)]),
-                          font_size=16).next_to(tex, DOWN)
-            newsquares = VGroup(*[Square().next_to(squares[-1], DOWN, buff=LARGE_BUFF) for _ in range(i + 1)])
-            newsquares.arrange_in_grid(cols=i + 1, rows=1, buff=LARGE_BUFF)
-            squares.append(newsquares)
-            texts.append(newtex)
-            onsnewtex = split_text_by_word(newtex)
-            for i, square in enumerate(newsquares.submobjects):
-                fit_mobject_within_another(onsnewtex[i], square)
-            self.add(newtex)
-        everything = VGroup(*squares)
+        num_of_rows = self.num_of_rows
+        top = Square().to_edge(UP).get_center()
+        if num_of_rows > self.lod_rows:
+            triangle = TriangleLOD(num_of_rows, log_binomial_heatmap(num_of_rows), exact_row_labels,
+                                   self.camera.frame, top=top)
+            self.add(triangle)
+            texts = [triangle]
+            everything = bottom = triangle.image
+            starts = [triangle.cell_center(i, 0) for i in range(num_of_rows)]
+        else:
+            texts = []
+            tex = number_row([1], font_size=16).to_edge(UP)
+            texts.append(tex)
+            self.add(tex)
+            squares = TriangleGrid(num_of_rows, top=top)
+            fit_mobject_within_another(tex, squares[0][0])
+            self.add(tex)
+            rows = pascal_rows(0, num_of_rows)
+            for i in range(1, num_of_rows):
+                newtex = number_row(rows[i], font_size=16).next_to(tex, DOWN)
+                newsquares = squares[i]
+                texts.append(newtex)
+                onsnewtex = newtex.submobjects
+                for i, square in enumerate(newsquares.submobjects):
+                    fit_mobject_within_another(onsnewtex[i], square)
+                self.add(newtex)
+            everything = squares
+            bottom = squares[-1]
+            starts = [row[0].get_center() for row in squares]
         self.camera.frame.match_height(everything)
         self.camera.frame.rescale_to_fit(everything.length_over_dim(1) + 2, 1)
         self.camera.frame.move_to(everything)
@@ -574,28 +696,29 @@ class Phi(MovingCameraScene):
         self.next_section("Draw Arrows")
         arrs = []
         nums = []
-        for i, row in enumerate(squares):
-            start = row[0].get_center()
+        for i, start in enumerate(starts):
             # constant slope calculated through pain
             end = start + (np.array([2.25, 1.5, 0]) * (i + 1))
             arr = Arrow(start=start, end=end)
             arrs.append(arr)
 
-            num = fit_mobject_within_another(Text(str(fib(i))), Square(side_length=1).next_to(arr, UR))
+            num = fit_mobject_within_another(number_label(fib(i)), Square(side_length=1).next_to(arr, UR))
             nums.append(num)
 
         self.play(LaggedStart(*[Create(arr) for arr in arrs]), run_time=3)
         self.play(LaggedStart(self.camera.auto_zoom(nums, 4),
                               *[Write(num) for num in nums]), run_time=2)
         self.next_section("Draw Fibbonaci Numbers")
-        newsquares = VGroup(*[Square().next_to(squares[-1], DOWN, buff=LARGE_BUFF) for _ in range(num_of_rows)])
+        newsquares = VGroup(*[Square().next_to(bottom, DOWN, buff=LARGE_BUFF) for _ in range(num_of_rows)])
         newsquares.arrange_in_grid(rows=1, buff=LARGE_BUFF)
         fit_mobject_within_another(newsquares, self.camera.frame, LARGE_BUFF)
         newnums = []
         for i, square in enumerate(newsquares.submobjects):
-            num = Text(str(fib(i)))
+            num = number_label(fib(i))
             newnums.append(num)
             fit_mobject_within_another(num, square)
+        # a TriangleLOD fades out as whatever it shows right now, not swapping cells mid fade
+        [text.clear_updaters() for text in texts]
         self.play(*[Transform(nums[i], newnums[i]) for i in range(num_of_rows)],
                   *[FadeOut(obj) for obj in arrs + texts],
                   run_time=2)
@@ -627,7 +750,7 @@ class Phi(MovingCameraScene):
         newsquares += Square().next_to(newsquares[-1], RIGHT, buff=LARGE_BUFF)
         numparade = []
         for i in range(2, num_of_rows + 1):
-            num = Text(str(fib(i)))
+            num = number_label(fib(i))
             numparade.append(num)
             fit_mobject_within_another(num, newsquares[i])
         self.remove(*nums_to_fade_out)
@@ -639,9 +762,9 @@ class Phi(MovingCameraScene):
             Transform(nums[1], frac.submobjects[2], replace_mobject_with_target_in_scene=True),
             run_time=2
         )
-        for fibn in range(2, 10):
-            newnumerator = str(fib(fibn + 1))
-            newdenominator = str(fib(fibn))
+        for fibn, ratio in enumerate(fib_ratios(2, 10), 2):
+            newnumerator = str(ratio.numerator)
+            newdenominator = str(ratio.denominator)
             newfrac = SingleStringMathTex(r"\frac{" + newnumerator + "}{" + newdenominator + "}",
                                           font_size=300)
             fit_mobject_within_another(newfrac, fracbound)
@@ -657,7 +780,7 @@ class Phi(MovingCameraScene):
                   range(1, len(numparade))],
                 run_time=0.5
             )
-            num = Text(str(fib(fibn + num_of_rows)))
+            num = number_label(fib(fibn + num_of_rows))
             fit_mobject_within_another(num, newsquares[-1])
             del numparade[0]
             numparade.append(num)
@@ -696,9 +819,14 @@ def normalize(v):
     return v / norm
 
 
-class BuildTriangle(MovingCameraScene):
+class BuildTriangle(PascalScene):
+    num_of_rows = 20
+    # rows past this are built all at once by TriangleLOD instead of out of the digits of the row above, they're too
+    # small to read by then anyway
+    lod_rows = 30
+
     def construct(self):
-        tex = Text("1", font_size=16).to_edge(UP)
+        tex = number_row([1], font_size=16).to_edge(UP)
         self.add(tex)
         square = Square().to_edge(UP)
         fit_mobject_within_another(tex, square)
@@ -707,23 +835,32 @@ class BuildTriangle(MovingCameraScene):
         self.camera.frame.rescale_to_fit(square.length_over_dim(1) + 1, 1)
         self.camera.frame.move_to(square)
         self.play(Write(tex), run_time=2)
-        for i in range(1, 20):
-            newtex = Text(r"   ".join([f'{j:g}' for j in pascal_row(i)]),
-                          font_size=16).next_to(tex, DOWN)
-            newsquares = VGroup(*[Square().next_to(squares[-1], DOWN, buff=LARGE_BUFF) for _ in range(i + 1)])
-            newsquares.arrange_in_grid(cols=i + 1, rows=1, buff=LARGE_BUFF)
+        top = square.get_center()
+        built = min(self.num_of_rows, self.lod_rows)
+        rows = pascal_rows(0, built)
+        grid = TriangleGrid(built, top=top)
+        for i in range(1, built):
+            newtex = number_row(rows[i], font_size=16).next_to(tex, DOWN)
+            newsquares = grid[i]
             squares.append(newtex)
             transforms = []
-            onsnewtex = split_text_by_word(newtex)
+            onsnewtex = newtex.submobjects
             for i, square in enumerate(newsquares.submobjects):
                 fit_mobject_within_another(onsnewtex[i], square)
-            for j, mobj in enumerate(split_text_by_word(tex)):
-                transforms += [Transform(mobj.copy(), onsnewtex[j]),
-                               Transform(mobj.copy(), onsnewtex[j + 1])]
-            self.play(*transforms, self.camera.auto_zoom(squares, 1), run_time=2)
+            for j, mobj in enumerate(tex.submobjects):
+                transforms += [(mobj.copy(), onsnewtex[j]),
+                               (mobj.copy(), onsnewtex[j + 1])]
+            self.play(BatchTransform(transforms), self.camera.auto_zoom(squares, 1), run_time=2)
             # self.add(newtex)
             # self.play(self.camera.auto_zoom(all_mobjects, 1), run_time=2)
             tex = newtex
+        if self.num_of_rows > built:
+            triangle = TriangleLOD(self.num_of_rows, log_binomial_heatmap(self.num_of_rows), exact_row_labels,
+                                   self.camera.frame, top=top)
+            self.remove(*squares)
+            self.add(triangle)
+            # the updater swaps the cells for the image by itself once they get too small
+            self.play(self.camera.auto_zoom([triangle.image], 1), run_time=4)
 
 
 def fit_mobject_within_another(mobj: Mobject, fit: Mobject, buff: float = 0) -> Mobject:
@@ -734,17 +871,32 @@ def fit_mobject_within_another(mobj: Mobject, fit: Mobject, buff: float = 0) ->
     return mobj
 
 
-class Squares(MovingCameraScene):
+class Squares(PascalScene):
+    num_of_rows = 10
+    # with more rows than this the triangle is drawn by TriangleLOD instead of a Square and Text per cell
+    lod_rows = 30
+
     def construct(self):
-        square = Square().to_edge(UP)
-        squares = [square]
-        self.add(square)
-        for i in range(1, 10):
-            newsquares = VGroup(*[Square().next_to(squares[-1], DOWN, buff=LARGE_BUFF) for _ in range(i + 1)])
-            newsquares.arrange_in_grid(cols=i + 1, rows=1, buff=LARGE_BUFF)
+        if self.num_of_rows > self.lod_rows:
+            self.construct_lod()
+            return
+        squares = TriangleGrid(self.num_of_rows, top=Square().to_edge(UP).get_center())
+        self.add(squares[0])
+        rows = pascal_rows(0, self.num_of_rows)
+        for i in range(1, self.num_of_rows):
+            newsquares = squares[i]
             self.add(newsquares)
-            prow = pascal_row(i)
+            prow = rows[i]
             for i, square in enumerate(newsquares.submobjects):
-                self.add(fit_mobject_within_another(Text(str(prow[i]), font_size=16), square))
-            squares.append(newsquares)
-            self.play(self.camera.auto_zoom(squares, 1), run_time=0.5)
+                self.add(fit_mobject_within_another(number_label(prow[i], font_size=16), square))
+            self.play(self.camera.auto_zoom(squares[:len(prow)], 1), run_time=0.5)
+
+    def construct_lod(self):
+        triangle = TriangleLOD(self.num_of_rows, log_binomial_heatmap(self.num_of_rows), exact_row_labels,
+                               self.camera.frame, top=UP * 3)
+        self.camera.frame.move_to(triangle.cell_center(2, 1)).scale_to_fit_height(5 * CELL_PITCH)
+        triangle.update_lod()
+        self.add(triangle)
+        self.wait(0.5)
+        # the updater swaps the cells for the image by itself once they get too small
+        self.play(self.camera.auto_zoom([triangle.image], 1), run_time=4)
@@ -0,0 +1,50 @@
+"""
+files shared by every render, and by every shard of parallelrender.py: a lock and atomic writes that work across
+processes, and the media dir such files belong in.
+
+parallelrender.py gives each shard its own media_dir so their movies don't collide, and sets PASCALMANIM_MEDIA_ROOT to
+the media_dir they were started from, which is where anything meant for all of them goes.
+"""
+import contextlib
+import os
+import time
+
+from manim import config
+
+
+def media_root() -> str:
+    """
+    the media dir of the whole project, the same in every shard
+    """
+    return os.path.abspath(os.environ.get("PASCALMANIM_MEDIA_ROOT") or config.media_dir)
+
+
+@contextlib.contextmanager
+def file_lock(path: str, stale_after: float = 300):
+    """
+    cross-process lock using an O_EXCL lock file next to path, a lock older than stale_after seconds is assumed to
+    belong to a dead process and taken over
+    """
+    lock = path + ".lock"
+    while True:
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            with contextlib.suppress(OSError):
+                if time.time() - os.path.getmtime(lock) > stale_after:
+                    os.remove(lock)
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        with contextlib.suppress(OSError):
+            os.remove(lock)
+
+
+def atomic_write(path: str, data: bytes):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
@@ -0,0 +1,81 @@
+"""
+a fast path for the parts of a render where nothing moves.
+
+manim already notices a wait() with nothing moving and only draws its frame once, but it still hands that frame to
+ffmpeg once per frame of the wait, through a pipe, at full resolution. here the frame is written to a file once
+instead, and the same ffmpeg command manim started for the partial movie is rerun with that file looped as its input,
+so the encoder gets exactly the frames it would have, and the output matches every other partial movie, without
+python pushing any of them.
+
+set PASCALMANIM_STILL_FRAMES=0 to turn it off.
+"""
+import os
+import subprocess
+from typing import Callable, Optional
+
+import numpy as np
+from manim import config
+
+# holds shorter than this many frames aren't worth starting another ffmpeg for
+MIN_HELD_FRAMES = 3
+
+
+class StillFrames:
+    """
+    takes over renderer.freeze_current_frame, which is what the renderer calls for a frozen wait()
+    """
+
+    def __init__(self, renderer, on_hold: Optional[Callable[[int], None]] = None):
+        """
+        :param on_hold: called with the number of frames of every held frame, they never go through write_frame
+        """
+        self.renderer = renderer
+        self.on_hold = on_hold
+        self.enabled = os.environ.get("PASCALMANIM_STILL_FRAMES", "1") != "0"
+        self.held_frames = 0
+        freeze_current_frame = renderer.freeze_current_frame
+
+        def held_freeze_current_frame(duration: float):
+            # counted the way the renderer counts them
+            frames = int(duration / (1 / renderer.camera.frame_rate))
+            if not self.hold(frames):
+                freeze_current_frame(duration)
+
+        renderer.freeze_current_frame = held_freeze_current_frame
+
+    def hold(self, frames: int) -> bool:
+        """
+        encode the current frame frames times into the partial movie being written
+        :return: False if it can't be done here and the frames have to be written the usual way
+        """
+        renderer = self.renderer
+        file_writer = renderer.file_writer
+        process = getattr(file_writer, "writing_process", None)
+        if (not self.enabled or renderer.skip_animations or not config.write_to_movie or frames < MIN_HELD_FRAMES
+                or process is None or process.poll() is not None):
+            return False
+        command = list(process.args)
+        if "-" not in command or command[command.index("-") - 1] != "-i":
+            return False
+        output = command[-1]
+        frame_path = output + ".still.rgba"
+        np.ascontiguousarray(renderer.get_frame()).tofile(frame_path)
+        # the piped ffmpeg has to let go of the output before it gets rewritten
+        process.stdin.close()
+        process.wait()
+        i = command.index("-")
+        command = command[:i - 1] + ["-stream_loop", "-1", "-i", frame_path] + command[i + 1:-1] + \
+            ["-frames:v", str(frames), output]
+        held = subprocess.Popen(command, stdin=subprocess.PIPE)
+        held.stdin.close()
+        held.wait()
+        os.remove(frame_path)
+        if held.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed holding a frame for {frames} frames: {' '.join(command)}")
+        # end_animation() closes and waits for this one, which is already done
+        file_writer.writing_process = held
+        renderer.time += frames * (1 / renderer.camera.frame_rate)
+        self.held_frames += frames
+        if self.on_hold:
+            self.on_hold(frames)
+        return True
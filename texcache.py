@@ -0,0 +1,176 @@
+"""
+persistent TeX cache shared by every process (and machine) pointed at the same directory.
+
+the .tex/.dvi/.svg files manim writes are already named by a hash of the whole tex file, so putting tex_dir somewhere
+shared is enough for LaTeX to run once per unique string. on top of that the paths parsed out of each svg are pickled
+next to it, and every scene keeps a manifest of the TeX it compiled so the next render can compile whatever is missing
+up front in a process pool instead of one at a time during construct(). the manifests live outside the cache
+(PASCALMANIM_TEX_MANIFESTS, media/texmanifests by default), so a wiped or new cache is refilled in parallel too.
+"""
+import hashlib
+import importlib
+import itertools
+import json
+import multiprocessing
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from manim import SingleStringMathTex, SVGMobject, config, logger
+from manim.utils import tex_file_writing
+
+from sharedfiles import atomic_write, file_lock
+
+CACHE_DIR = os.path.abspath(os.environ.get("PASCALMANIM_TEX_CACHE", os.path.join("media", "texcache")))
+# kept apart from the cache, so wiping the cache leaves the list of what to recompile
+MANIFEST_DIR = os.path.abspath(os.environ.get("PASCALMANIM_TEX_MANIFESTS", os.path.join("media", "texmanifests")))
+
+_tex_module = importlib.import_module(SingleStringMathTex.__module__)
+_original_tex_to_svg_file = _tex_module.tex_to_svg_file
+_original_generate_points = SVGMobject.generate_points
+
+# tex hash -> what's needed to compile it again, for everything compiled since the last start_recording()
+_recorded: Dict[str, Dict[str, str]] = {}
+# svg key -> parsed submobjects, copied out on every hit
+_parsed: Dict[str, List[SVGMobject]] = {}
+# how many TeX files this process had to compile (or prefetch), and how long that took in total
+compile_stats = {"compiles": 0, "seconds": 0.0}
+
+
+def _texcode(expression: str, environment: Optional[str], tex_template) -> str:
+    # same as manim's generate_tex_file, which names the file after the hash of this
+    if environment is not None:
+        return tex_template.get_texcode_for_expression_in_env(expression, environment)
+    return tex_template.get_texcode_for_expression(expression)
+
+
+def _svg_path(key: str) -> str:
+    return os.path.join(config.get_dir("tex_dir"), key + ".svg")
+
+
+def _cached_tex_to_svg_file(expression: str, environment: Optional[str] = None, tex_template=None) -> str:
+    if tex_template is None:
+        tex_template = config["tex_template"]
+    texcode = _texcode(expression, environment, tex_template)
+    key = tex_file_writing.tex_hash(texcode)
+    _recorded[key] = {"texcode": texcode, "compiler": tex_template.tex_compiler,
+                      "output_format": tex_template.output_format}
+    svg = _svg_path(key)
+    if os.path.exists(svg):
+        return svg
+    start = time.perf_counter()
+    # another render sharing the directory might be compiling the same file right now
+    with file_lock(svg):
+        # whoever held the lock may have just compiled it
+        if os.path.exists(svg):
+            return svg
+        result = _original_tex_to_svg_file(expression, environment, tex_template)
+    compile_stats["compiles"] += 1
+    compile_stats["seconds"] += time.perf_counter() - start
+    return result
+
+
+def _svg_key(mobj: SVGMobject) -> str:
+    hasher = hashlib.sha256()
+    with open(mobj.file_path, "rb") as f:
+        hasher.update(f.read())
+    # the parse options that change what comes out of the same file
+    hasher.update(repr((getattr(mobj, "unpack_groups", None),
+                        getattr(mobj, "should_subdivide_sharp_curves", None),
+                        getattr(mobj, "should_remove_null_curves", None),
+                        getattr(mobj, "path_string_config", None))).encode())
+    return hasher.hexdigest()[:16]
+
+
+def _cached_generate_points(self: SVGMobject):
+    key = _svg_key(self)
+    cached = _parsed.get(key)
+    if cached is None:
+        path = os.path.join(CACHE_DIR, key + ".pkl")
+        try:
+            with open(path, "rb") as f:
+                cached = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            _original_generate_points(self)
+            _parsed[key] = [m.copy() for m in self.submobjects]
+            atomic_write(path, pickle.dumps(_parsed[key]))
+            return
+        _parsed[key] = cached
+    self.add(*[m.copy() for m in cached])
+
+
+def install():
+    """
+    point manim's tex_dir at the shared cache and route TeX compilation and svg parsing through it
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    os.makedirs(MANIFEST_DIR, exist_ok=True)
+    config.tex_dir = CACHE_DIR
+    _tex_module.tex_to_svg_file = _cached_tex_to_svg_file
+    SVGMobject.generate_points = _cached_generate_points
+
+
+def _manifest_path(scene_name: str) -> str:
+    return os.path.join(MANIFEST_DIR, scene_name + ".json")
+
+
+def load_manifest(scene_name: str) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(_manifest_path(scene_name)) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def start_recording():
+    _recorded.clear()
+
+
+def save_manifest(scene_name: str):
+    """
+    add everything compiled since start_recording() to the scene's manifest
+    """
+    manifest = load_manifest(scene_name)
+    if _recorded.keys() <= manifest.keys():
+        return
+    manifest.update(_recorded)
+    atomic_write(_manifest_path(scene_name), json.dumps(manifest, indent=4).encode())
+
+
+def _compile(entry: Dict[str, str], tex_dir: str) -> str:
+    config.tex_dir = tex_dir
+    key = tex_file_writing.tex_hash(entry["texcode"])
+    svg = _svg_path(key)
+    with file_lock(svg):
+        if os.path.exists(svg):
+            return svg
+        tex_file = os.path.join(tex_dir, key + ".tex")
+        if not os.path.exists(tex_file):
+            atomic_write(tex_file, entry["texcode"].encode())
+        dvi_file = tex_file_writing.compile_tex(tex_file, entry["compiler"], entry["output_format"])
+        return tex_file_writing.convert_to_svg(dvi_file, entry["output_format"])
+
+
+def prefetch(scene_name: str, processes: Optional[int] = None) -> int:
+    """
+    compile every TeX file in the scene's manifest that isn't in the cache yet, in a process pool
+    :param scene_name: the manifest to read, the name of the scene class
+    :param processes: pool size, defaults to the number of cpus
+    :return: how many files had to be compiled
+    """
+    # pool workers (parallelrender.py's shards) are daemonic and can't start processes of their own, the parent
+    # prefetches before starting them instead
+    if multiprocessing.current_process().daemon:
+        return 0
+    missing = [entry for key, entry in load_manifest(scene_name).items() if not os.path.exists(_svg_path(key))]
+    if not missing:
+        return 0
+    logger.info(f"Prefetching {len(missing)} TeX files for {scene_name}")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(processes) as pool:
+        list(pool.map(_compile, missing, itertools.repeat(config.get_dir("tex_dir"))))
+    compile_stats["compiles"] += len(missing)
+    compile_stats["seconds"] += time.perf_counter() - start
+    return len(missing)
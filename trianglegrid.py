@@ -0,0 +1,68 @@
+"""
+the cell layout every triangle scene uses: Square() cells with LARGE_BUFF between neighbours and between rows, each
+row centered under the one above it.
+"""
+from typing import List
+
+import numpy as np
+from manim import LARGE_BUFF, ORIGIN, Square, VGroup, VMobject
+
+CELL_SIDE = 2
+CELL_PITCH = CELL_SIDE + LARGE_BUFF
+
+
+def cell_centers(n: np.ndarray, k: np.ndarray, top: np.ndarray = ORIGIN) -> np.ndarray:
+    """
+    :param n: row indices
+    :param k: column indices, broadcast against n
+    :param top: center of the cell of row 0
+    :return: (..., 3) array of the centers of cells (n, k)
+    """
+    n, k = np.broadcast_arrays(np.asarray(n, dtype=float), np.asarray(k, dtype=float))
+    return np.asarray(top, dtype=float) + np.stack([(k - n / 2) * CELL_PITCH, -n * CELL_PITCH, np.zeros_like(n)],
+                                                   axis=-1)
+
+
+class TriangleGrid(VGroup):
+    """
+    the cells of the first rows rows of the triangle, one VGroup per row so grid[n][k] is cell (n, k).
+    the points of a single Square are computed once and every cell is those points shifted by its offset, all the
+    offsets come from one array operation instead of next_to and arrange_in_grid on every Square.
+    """
+
+    def __init__(self, rows: int, top: np.ndarray = ORIGIN, **kwargs):
+        super().__init__(**kwargs)
+        self.rows = rows
+        self.top = np.array(top, dtype=float)
+        template = Square(CELL_SIDE).get_points()
+        n = np.repeat(np.arange(rows), np.arange(1, rows + 1))
+        k = np.arange(len(n)) - n * (n + 1) // 2
+        # (cells, 3) offsets of the cells, row by row
+        self.offsets = cell_centers(n, k, self.top)
+        for row in range(rows):
+            start = row * (row + 1) // 2
+            self.add(VGroup(*[self._instance(template, offset) for offset in self.offsets[start:start + row + 1]]))
+
+    @staticmethod
+    def _instance(template: np.ndarray, offset: np.ndarray) -> VMobject:
+        cell = VMobject()
+        cell.set_points(template + offset)
+        return cell
+
+    def cell(self, n: int, k: int) -> VMobject:
+        return self.submobjects[n].submobjects[k]
+
+    def cells_where(self, mask: np.ndarray) -> List[VMobject]:
+        """
+        :param mask: (rows, cols) array, e.g. from binomial_residues
+        :return: every cell (n, k) where mask[n, k] is nonzero, row by row
+        """
+        return [self.cell(n, k) for n, k in zip(*np.nonzero(mask[:self.rows])) if k <= n]
+
+    def set_cell_style(self, mask: np.ndarray, **style) -> "TriangleGrid":
+        """
+        set_style(**style) on every cell where mask is nonzero
+        """
+        for cell in self.cells_where(mask):
+            cell.set_style(**style)
+        return self
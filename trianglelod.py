@@ -0,0 +1,133 @@
+"""
+level of detail for pascal's triangles too big to draw as a Square and Text per cell.
+
+the whole triangle is one image generated with numpy (a heatmap of the values, or of their residues), and only once
+the camera is zoomed in far enough for the numbers to be readable do the cells in view become real vector mobjects.
+"""
+import functools
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from manim import (BLUE, DOWN, ORIGIN, RESAMPLING_ALGORITHMS, YELLOW, Group, ImageMobject, Mobject, Square, VGroup,
+                   color_to_rgb, config)
+
+from glyphs import number_label
+from pascalmath import backend
+from trianglegrid import CELL_PITCH, CELL_SIDE, cell_centers
+
+
+def log_binomial_heatmap(rows: int) -> Callable[[np.ndarray, np.ndarray], np.ndarray]:
+    """
+    :return: a function of broadcast (n, k) arrays giving log C(n, k) scaled so the biggest value in the first rows
+        rows is 1
+    """
+    gammaln = backend("scipy.special").gammaln
+    top = gammaln(rows) - gammaln((rows + 1) // 2) - gammaln(rows // 2 + 1)
+
+    def heat(n: np.ndarray, k: np.ndarray) -> np.ndarray:
+        return (gammaln(n + 1) - gammaln(k + 1) - gammaln(n - k + 1)) / max(top, 1)
+
+    return heat
+
+
+class TriangleLOD(Group):
+    """
+    the first rows rows of pascal's triangle, drawn as an image while the cells are too small to read and as a
+    Square and Text per cell while the camera is zoomed in on them. it follows the camera frame with an updater, so
+    zooming with camera.auto_zoom or frame.animate switches between the two by itself.
+    """
+
+    def __init__(self, rows: int, heat: Callable[[np.ndarray, np.ndarray], np.ndarray],
+                 row_labels: Callable[[int], List[str]], frame: Mobject, top: np.ndarray = ORIGIN,
+                 min_cell_pixels: float = 24, max_vector_cells: int = 400, max_resolution: int = 2048,
+                 colors: Tuple[str, str] = (BLUE, YELLOW), **kwargs):
+        """
+        :param rows: how many rows of the triangle
+        :param heat: value between 0 and 1 to color each cell of the image by, a function of broadcast (n, k) arrays
+        :param row_labels: the text of every cell of row n
+        :param frame: the camera frame to follow
+        :param top: center of the cell of row 0
+        :param min_cell_pixels: cells smaller than this on screen are drawn as the image
+        :param max_vector_cells: with more cells than this in view the image is used anyway
+        :param max_resolution: the image is never more than this many pixels high, rows get sampled past that
+        :param colors: the colors of heat 0 and heat 1
+        """
+        super().__init__(**kwargs)
+        self.rows = rows
+        self.frame = frame
+        self.top = np.array(top, dtype=float)
+        self.min_cell_pixels = min_cell_pixels
+        self.max_vector_cells = max_vector_cells
+        self.row_labels = functools.lru_cache(maxsize=256)(row_labels)
+        self._cells = {}
+        self.image = self._make_image(heat, min(rows, max_resolution), colors)
+        self.update_lod()
+        self.add_updater(lambda m: m.update_lod())
+
+    def _make_image(self, heat: Callable[[np.ndarray, np.ndarray], np.ndarray], res: int,
+                    colors: Tuple[str, str]) -> ImageMobject:
+        low, high = (np.array(color_to_rgb(c)) * 255 for c in colors)
+        pixels = np.zeros((res, 2 * res, 4), dtype=np.uint8)
+        # each cell is 2 half cells wide, cell (n, k) covers half cells 2k - n - 1 + rows and the one after it
+        u = (np.arange(2 * res) + 0.5) * self.rows / res
+        for start in range(0, res, 256):
+            n = ((np.arange(start, min(start + 256, res)) + 0.5) * self.rows / res).astype(np.int64)[:, np.newaxis]
+            k = np.floor((u + n + 1 - self.rows) / 2).astype(np.int64)
+            inside = (k >= 0) & (k <= n)
+            h = np.clip(heat(n, np.where(inside, k, 0)), 0, 1)[..., np.newaxis]
+            block = pixels[start:start + len(n)]
+            block[..., :3] = low + (high - low) * h
+            block[..., 3] = np.where(inside, 255, 0)
+        image = ImageMobject(pixels)
+        image.set_resampling_algorithm(RESAMPLING_ALGORITHMS["nearest"])
+        image.stretch_to_fit_width(self.rows * CELL_PITCH)
+        image.stretch_to_fit_height(self.rows * CELL_PITCH)
+        image.move_to(self.top + (DOWN * (self.rows - 1) * CELL_PITCH / 2))
+        return image
+
+    def cell_center(self, n: int, k: int) -> np.ndarray:
+        return cell_centers(n, k, self.top)
+
+    def _cell(self, n: int, k: int) -> VGroup:
+        if (n, k) not in self._cells:
+            square = Square(CELL_SIDE).move_to(self.cell_center(n, k))
+            text = number_label(self.row_labels(n)[k], font_size=16).move_to(square)
+            text.scale_to_fit_width(CELL_SIDE * 0.8)
+            if text.height > CELL_SIDE * 0.8:
+                text.scale_to_fit_height(CELL_SIDE * 0.8)
+            self._cells[n, k] = VGroup(square, text)
+        return self._cells[n, k]
+
+    def visible_cells(self) -> List[Tuple[int, int]]:
+        """
+        every cell at least partly inside the camera frame
+        """
+        cx, cy, _ = self.frame.get_center()
+        half_w = self.frame.width / 2 + CELL_PITCH
+        half_h = self.frame.height / 2 + CELL_PITCH
+        first = max(int(np.ceil((self.top[1] - cy - half_h) / CELL_PITCH)), 0)
+        last = min(int(np.floor((self.top[1] - cy + half_h) / CELL_PITCH)), self.rows - 1)
+        cells = []
+        for n in range(first, last + 1):
+            lo = max(int(np.ceil((cx - half_w - self.top[0]) / CELL_PITCH + n / 2)), 0)
+            hi = min(int(np.floor((cx + half_w - self.top[0]) / CELL_PITCH + n / 2)), n)
+            cells += [(n, k) for k in range(lo, hi + 1)]
+            if len(cells) > self.max_vector_cells:
+                break
+        return cells
+
+    def cell_pixels(self) -> float:
+        return CELL_SIDE * config.pixel_width / self.frame.width
+
+    def update_lod(self) -> "TriangleLOD":
+        cells: Optional[List[Tuple[int, int]]] = None
+        if self.cell_pixels() >= self.min_cell_pixels:
+            cells = self.visible_cells()
+        if cells is None or len(cells) > self.max_vector_cells:
+            self.submobjects = [self.image]
+        else:
+            self.submobjects = [self._cell(n, k) for n, k in cells]
+            if len(self._cells) > 4 * self.max_vector_cells:
+                # forget the cells the camera has moved away from
+                self._cells = {cell: self._cells[cell] for cell in cells}
+        return self
@@ -0,0 +1,152 @@
+"""
+pascal's triangle on disk, for row counts where holding every row in memory isn't an option.
+
+rows are streamed from iter_pascal_rows and appended to memory mapped files, then any row can be read back without
+recomputing the ones before it. with a modulus the rows are fixed width residues, one after the other. without one
+only the first half of every row is stored (the rest is its mirror image), as little endian blobs where every entry
+of a row is as wide as the biggest, with an index of where each row starts.
+
+the exact triangle grows fast, row n takes about n^2 / 16 bytes, so it's only practical for a few thousand rows.
+residues take (n + 1) bytes per row for moduli up to 128.
+"""
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+from pascalmath import INT64_MAX_ROW, iter_pascal_rows
+
+
+class TriangleStore:
+    """
+    the first rows rows of pascal's triangle, optionally mod modulus, backed by files at path + ".json" / ".res" /
+    ".bin" / ".idx". an existing store is reused and only extended with the rows it's missing.
+    store[n] is row n.
+    """
+
+    def __init__(self, path: str, rows: int, modulus: Optional[int] = None):
+        self.path = path
+        self.modulus = modulus
+        self.rows = 0
+        meta = self._load_meta()
+        if meta is not None and meta["modulus"] == modulus:
+            self.rows = meta["rows"]
+        self._truncate()
+        if self.rows < rows:
+            self.extend(rows)
+        else:
+            self._open()
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.min_scalar_type(2 * (self.modulus - 1))
+
+    def _load_meta(self) -> Optional[dict]:
+        try:
+            with open(self.path + ".json") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_meta(self):
+        tmp = self.path + ".json.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"rows": self.rows, "modulus": self.modulus}, f)
+        os.replace(tmp, self.path + ".json")
+
+    def _truncate(self):
+        """
+        cut the files back to the rows the metadata says are complete, anything after that is from an interrupted
+        extend() (or a store with another modulus)
+        """
+        if self.modulus is not None:
+            self._truncate_file(".res", self.rows * (self.rows + 1) // 2 * self.dtype.itemsize)
+            return
+        self._truncate_file(".idx", (self.rows + 1) * 8 if self.rows else 0)
+        end = self._index()[-1] if self.rows else 0
+        self._truncate_file(".bin", end)
+
+    def _truncate_file(self, suffix: str, size: int):
+        with open(self.path + suffix, "ab") as f:
+            f.truncate(size)
+
+    def _index(self) -> np.ndarray:
+        return np.fromfile(self.path + ".idx", dtype="<i8")
+
+    def extend(self, rows: int):
+        """
+        compute and append rows self.rows..rows-1, starting from the last stored row
+        """
+        start = max(self.rows - 1, 0)
+        skip = self.rows - start
+        if self.modulus is not None:
+            with open(self.path + ".res", "ab") as f:
+                for row in iter_pascal_rows(start, rows, self.modulus):
+                    if skip:
+                        skip -= 1
+                        continue
+                    row.astype(self.dtype.newbyteorder("<"), copy=False).tofile(f)
+        else:
+            with open(self.path + ".bin", "ab") as data, open(self.path + ".idx", "ab") as index:
+                if self.rows == 0:
+                    np.array([0], dtype="<i8").tofile(index)
+                offset = data.tell()
+                for n, row in enumerate(iter_pascal_rows(start, rows), start):
+                    if skip:
+                        skip -= 1
+                        continue
+                    half = row[:n // 2 + 1]
+                    width = max((int(half[-1]).bit_length() + 7) // 8, 1)
+                    data.write(b"".join(int(c).to_bytes(width, "little") for c in half))
+                    offset += width * len(half)
+                    np.array([offset], dtype="<i8").tofile(index)
+        self.rows = max(rows, self.rows)
+        self._save_meta()
+        self._open()
+
+    def _open(self):
+        # np.memmap can't map empty files
+        if self.rows == 0:
+            self._data = np.empty(0, dtype=np.uint8)
+        elif self.modulus is not None:
+            self._data = np.memmap(self.path + ".res", dtype=self.dtype.newbyteorder("<"), mode="r")
+        else:
+            self._offsets = np.memmap(self.path + ".idx", dtype="<i8", mode="r")
+            self._data = np.memmap(self.path + ".bin", dtype=np.uint8, mode="r")
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, n: int) -> np.ndarray:
+        """
+        :return: row n, a read only view into the file for residues, or an array like exact_pascal_row's
+        """
+        if not 0 <= n < self.rows:
+            raise IndexError(f"row {n} isn't in a store of {self.rows} rows")
+        if self.modulus is not None:
+            start = n * (n + 1) // 2
+            return self._data[start:start + n + 1]
+        start, end = self._offsets[n], self._offsets[n + 1]
+        half_len = n // 2 + 1
+        width = (end - start) // half_len
+        blob = self._data[start:end].tobytes()
+        half = np.empty(half_len, dtype=np.int64 if n <= INT64_MAX_ROW else object)
+        for k in range(half_len):
+            half[k] = int.from_bytes(blob[k * width:(k + 1) * width], "little")
+        return np.concatenate([half, half[:n + 1 - half_len][::-1]])
+
+    def residue_block(self, first_row: int = 0, rows: Optional[int] = None) -> np.ndarray:
+        """
+        rows first_row..first_row+rows-1 as a (rows, first_row + rows) array padded with zeros, like
+        binomial_residues returns
+        """
+        if self.modulus is None:
+            raise ValueError("residue_block needs a store with a modulus")
+        if rows is None:
+            rows = self.rows - first_row
+        out = np.zeros((rows, first_row + rows), dtype=self.dtype)
+        for i in range(rows):
+            row = self[first_row + i]
+            out[i, :len(row)] = row
+        return out